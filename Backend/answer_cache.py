@@ -0,0 +1,190 @@
+import asyncio
+import copy
+import json
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))  # cosine similarity
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "3600"))  # seconds
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+# Postgres NOTIFY channel that carries invalidations to the caches of the other API processes
+ANSWER_CACHE_CHANNEL = "answer_cache"
+_LISTEN_RETRY = 5.0
+
+
+class _Entry:
+    def __init__(self, query, vector, result, created):
+        self.query = query
+        self.vector = vector
+        self.result = result
+        self.sources = set(result.get("sources") or [])
+        self.created = created
+
+
+class AnswerCache:
+    """Semantic cache of finished answers, keyed on the embedding of the standalone query.
+
+    A lookup hits when a stored query is at least `threshold` cosine-similar and younger than
+    `ttl`. Entries are LRU-evicted past `max_entries` and dropped when one of their sources
+    is re-ingested. The cache is shared across users, so callers store only answers generated
+    without conversation history.
+    """
+
+    def __init__(self, threshold=ANSWER_CACHE_THRESHOLD, ttl=ANSWER_CACHE_TTL, max_entries=ANSWER_CACHE_MAX_ENTRIES):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._matrix = None  # stacked vectors in _entries order, rebuilt lazily after changes
+        self._keys = []
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0, "invalidated": 0}
+
+    def _drop(self, key, counter):
+        del self._entries[key]
+        self._matrix = None
+        self.counters[counter] += 1
+
+    def _expire(self, now):
+        for key in [k for k, e in self._entries.items() if now - e.created > self.ttl]:
+            self._drop(key, "expired")
+
+    def lookup(self, vector):
+        """Return (result copy, similarity, matched query) for the closest fresh entry, or None."""
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        with self._lock:
+            self._expire(time.monotonic())
+            if not self._entries:
+                self.counters["misses"] += 1
+                return None
+            if self._matrix is None:
+                self._keys = list(self._entries)
+                self._matrix = np.vstack([self._entries[k].vector for k in self._keys])
+            scores = self._matrix @ vector
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            if similarity < self.threshold:
+                self.counters["misses"] += 1
+                return None
+            key = self._keys[best]
+            # LRU order only; the matrix keeps its own key order
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            entry = self._entries[key]
+            return copy.deepcopy(entry.result), similarity, entry.query
+
+    def store(self, query, vector, result):
+        result = {k: v for k, v in result.items() if k not in ("timings", "cache")}
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        with self._lock:
+            self._entries[self._next_id] = _Entry(query, vector, copy.deepcopy(result), time.monotonic())
+            self._next_id += 1
+            self._matrix = None
+            self.counters["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)), "evictions")
+
+    def invalidate_documents(self, doc_names):
+        """Drop every answer that cites one of doc_names; returns the number removed."""
+        doc_names = set(doc_names)
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if e.sources & doc_names]
+            for key in stale:
+                self._drop(key, "invalidated")
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else None,
+                "entries": len(self._entries),
+                "capacity": self.max_entries,
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache():
+    global _cache
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AnswerCache()
+    return _cache
+
+
+def _sender():
+    # per process, not per import: gunicorn workers are forked from one preloaded interpreter
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def publish_invalidation(doc_names=None):
+    """Tell the other API processes to drop answers citing doc_names (all answers when None)."""
+    from db import get_pool
+
+    payload = json.dumps({"sender": _sender(), "documents": None if doc_names is None else list(doc_names)})
+    with get_pool().connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT pg_notify(%s, %s)", (ANSWER_CACHE_CHANNEL, payload))
+        conn.commit()
+
+
+async def listen_for_invalidations():
+    """Apply other processes' invalidations to this process's cache until cancelled.
+
+    Notifications sent while disconnected are lost, so the cache is cleared on every reconnect.
+    """
+    import asyncpg
+    from db import PG_CONN_STR
+
+    cache = get_answer_cache()
+    if cache is None:
+        return
+
+    def on_message(connection, pid, channel, payload):
+        message = json.loads(payload)
+        if message.get("sender") == _sender():
+            return
+        if message.get("documents") is None:
+            cache.clear()
+        else:
+            cache.invalidate_documents(message["documents"])
+
+    connected_before = False
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(PG_CONN_STR)
+            await conn.add_listener(ANSWER_CACHE_CHANNEL, on_message)
+            if connected_before:
+                cache.clear()
+            connected_before = True
+            while True:
+                await asyncio.sleep(_LISTEN_RETRY)
+                await conn.execute("SELECT 1")  # notices a dropped connection
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Answer cache listener disconnected, retrying in {_LISTEN_RETRY:.0f}s: {e}")
+            await asyncio.sleep(_LISTEN_RETRY)
+        finally:
+            if conn is not None and not conn.is_closed():
+                await conn.close()
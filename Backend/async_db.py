@@ -0,0 +1,65 @@
+import asyncio
+import os
+import time
+import weakref
+from contextlib import asynccontextmanager
+import asyncpg
+from db import PG_CONN_STR, PG_CONNECT_TIMEOUT, PoolTimeout
+import metrics
+
+ASYNC_PG_POOL_MIN = int(os.getenv("ASYNC_PG_POOL_MIN", "2"))
+ASYNC_PG_POOL_MAX = int(os.getenv("ASYNC_PG_POOL_MAX", "20"))
+ASYNC_PG_POOL_TIMEOUT = float(os.getenv("ASYNC_PG_POOL_TIMEOUT", "10"))
+ASYNC_PG_COMMAND_TIMEOUT = float(os.getenv("ASYNC_PG_COMMAND_TIMEOUT", "30"))
+
+# asyncpg pools are bound to the loop they were created on, so keep one per loop
+_pools = weakref.WeakKeyDictionary()
+_pool_locks = weakref.WeakKeyDictionary()
+
+
+async def get_async_pool():
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        lock = _pool_locks.setdefault(loop, asyncio.Lock())
+        async with lock:
+            pool = _pools.get(loop)
+            if pool is None:
+                pool = _pools[loop] = await asyncpg.create_pool(
+                    PG_CONN_STR, min_size=ASYNC_PG_POOL_MIN, max_size=ASYNC_PG_POOL_MAX,
+                    timeout=PG_CONNECT_TIMEOUT, command_timeout=ASYNC_PG_COMMAND_TIMEOUT
+                )
+    return pool
+
+
+@asynccontextmanager
+async def connection():
+    """Acquire a pooled asyncpg connection; raises db.PoolTimeout like the sync pool when exhausted."""
+    pool = await get_async_pool()
+    start = time.perf_counter()
+    try:
+        conn = await pool.acquire(timeout=ASYNC_PG_POOL_TIMEOUT)
+    except asyncio.TimeoutError:
+        metrics.incr("db.async.pool_timeouts")
+        raise PoolTimeout(f"No database connection available within {ASYNC_PG_POOL_TIMEOUT}s")
+    metrics.observe("db.async.pool_wait_seconds", time.perf_counter() - start)
+    try:
+        yield conn
+    finally:
+        await pool.release(conn)
+
+
+def stats():
+    pools = list(_pools.values())
+    if not pools:
+        return {"name": "async", "min": ASYNC_PG_POOL_MIN, "max": ASYNC_PG_POOL_MAX, "size": 0, "idle": 0}
+    return {
+        "name": "async", "min": ASYNC_PG_POOL_MIN, "max": ASYNC_PG_POOL_MAX,
+        "size": sum(p.get_size() for p in pools), "idle": sum(p.get_idle_size() for p in pools)
+    }
+
+
+async def close_async_pool():
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.close()
@@ -0,0 +1,88 @@
+"""Recall@k and latency of the ANN index on doc_chunks.embedding against exact search.
+
+Run from Backend/:  python -m benchmarks.ann_recall [--queries 100] [--k 10]
+Queries are sampled from stored chunk texts and encoded as queries. Exact results come from
+a sequential scan (index scans disabled); ANN results are measured for a sweep of
+hnsw.ef_search or ivfflat.probes depending on the index currently built.
+"""
+import argparse
+import statistics
+import time
+from db import get_pool, vector_literal
+from embeddings import get_embedding_service
+import vector_index
+
+SEARCH_SQL = """
+    SELECT doc_name, chunk_id FROM doc_chunks
+    ORDER BY embedding <=> %s::vector
+    LIMIT %s
+"""
+
+HNSW_SWEEP = [10, 20, 40, 80, 160, 320]
+IVFFLAT_SWEEP = [1, 2, 5, 10, 20, 50]
+
+
+def sample_queries(conn, n):
+    with conn.cursor() as cur:
+        cur.execute("SELECT chunk_text FROM doc_chunks ORDER BY random() LIMIT %s", (n,))
+        texts = [row[0][:160] for row in cur.fetchall()]
+    conn.rollback()
+    return texts
+
+
+def run(conn, vectors, k, exact=False, ef_search=None, probes=None):
+    results, latencies = [], []
+    for vec in vectors:
+        literal = vector_literal(vec)
+        with conn.cursor() as cur:
+            if exact:
+                cur.execute("SET LOCAL enable_indexscan = off")
+                cur.execute("SET LOCAL enable_bitmapscan = off")
+            else:
+                vector_index.apply_search_settings(cur, ef_search=ef_search, probes=probes)
+            start = time.perf_counter()
+            cur.execute(SEARCH_SQL, (literal, k))
+            rows = cur.fetchall()
+            latencies.append(time.perf_counter() - start)
+        conn.rollback()
+        results.append({(d, c) for d, c in rows})
+    return results, latencies
+
+
+def summarize(label, latencies, recall):
+    ordered = sorted(latencies)
+    p95 = ordered[min(int(0.95 * len(ordered)), len(ordered) - 1)]
+    print(f"{label:<22} recall={recall:6.3f}  p50={statistics.median(ordered) * 1000:8.2f} ms  p95={p95 * 1000:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    pool = get_pool()
+    with pool.connection() as conn:
+        report = vector_index.index_report(conn)
+        print(f"rows={report['rows']}  index={report.get('method', 'none')}  "
+              f"index_bytes={report.get('index_bytes', 0)}")
+        texts = sample_queries(conn, args.queries)
+        vectors = get_embedding_service().encode_queries(texts)
+
+        truth, latencies = run(conn, vectors, args.k, exact=True)
+        summarize("exact (seq scan)", latencies, 1.0)
+
+        if not report["exists"]:
+            print("No ANN index; create one with POST /admin/index to compare.")
+            return
+
+        sweep = HNSW_SWEEP if report["method"] == "hnsw" else IVFFLAT_SWEEP
+        for value in sweep:
+            kwargs = {"ef_search": value} if report["method"] == "hnsw" else {"probes": value}
+            found, latencies = run(conn, vectors, args.k, **kwargs)
+            recall = statistics.mean(len(f & t) / max(len(t), 1) for f, t in zip(found, truth))
+            summarize(f"{report['method']} {list(kwargs)[0]}={value}", latencies, recall)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Hit-path latency of the semantic answer cache.
+
+Run from Backend/:  python -m benchmarks.answer_cache [--sizes 100 1000 10000] [--rounds 200]
+The cache is filled with runbook-heading questions (padded with random unit vectors up to
+each size) and canned answers. Reported per size:
+  lookup   - AnswerCache.lookup on a precomputed query vector
+  hit path - qa_gemini.answer_question_async end to end for a cached question (no history),
+             i.e. encode + lookup; no retrieval or generation runs
+Paraphrase hits show how many reworded questions clear ANSWER_CACHE_THRESHOLD.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+import numpy as np
+from answer_cache import AnswerCache, ANSWER_CACHE_THRESHOLD
+from benchmarks.batch_retrieval import runbook_questions
+from embeddings import get_embedding_service
+
+PARAPHRASE = ("How do I handle ", "What is the procedure for ")
+
+
+def summarize(label, latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[min(int(0.95 * len(ordered)), len(ordered) - 1)]
+    print(f"  {label:<10} p50={statistics.median(ordered) * 1000:8.3f} ms  p95={p95 * 1000:8.3f} ms")
+
+
+def fill(cache, questions, vectors, size, rng):
+    for q, v in zip(questions[:size], vectors[:size]):
+        cache.store(q, v, {"answer": f"Cached answer for: {q}", "sources": ["benchmark"], "is_runbook": False})
+    for i in range(len(questions), size):
+        noise = rng.standard_normal(vectors.shape[1]).astype(np.float32)
+        cache.store(f"filler {i}", noise / np.linalg.norm(noise), {"answer": "", "sources": ["benchmark"]})
+
+
+async def hit_path(qa_gemini, questions, rounds):
+    latencies, hits = [], 0
+    for i in range(rounds):
+        start = time.perf_counter()
+        result = await qa_gemini.answer_question_async(questions[i % len(questions)])
+        latencies.append(time.perf_counter() - start)
+        hits += result.get("cache") == "hit"
+    return latencies, hits
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("GROQ_API_KEY", "benchmark")  # the hit path never reaches the LLM
+    import qa_gemini
+
+    embedder = get_embedding_service()
+    embedder.warmup()
+    questions = runbook_questions()
+    vectors = np.asarray(embedder.encode_queries(questions), dtype=np.float32)
+    paraphrases = [q.replace(*PARAPHRASE) for q in questions]
+    paraphrase_vectors = np.asarray(embedder.encode_queries(paraphrases), dtype=np.float32)
+    rng = np.random.default_rng(0)
+    print(f"questions={len(questions)}  threshold={ANSWER_CACHE_THRESHOLD}")
+
+    for size in args.sizes:
+        cache = AnswerCache(max_entries=max(size, len(questions)), ttl=3600)
+        fill(cache, questions, vectors, size, rng)
+        stored = min(size, len(questions))
+        print(f"entries={cache.stats()['entries']}")
+
+        latencies = []
+        for i in range(args.rounds):
+            vec = vectors[i % stored]
+            start = time.perf_counter()
+            cache.lookup(vec)
+            latencies.append(time.perf_counter() - start)
+        summarize("lookup", latencies)
+
+        qa_gemini.get_answer_cache = lambda: cache
+        latencies, hits = asyncio.run(hit_path(qa_gemini, questions[:stored], args.rounds))
+        summarize("hit path", latencies)
+        print(f"  hits={hits}/{args.rounds}")
+
+        para_hits = sum(cache.lookup(v) is not None for v in paraphrase_vectors[:stored])
+        print(f"  paraphrase hits={para_hits}/{stored}")
+
+
+if __name__ == "__main__":
+    main()
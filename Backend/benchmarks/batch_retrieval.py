@@ -0,0 +1,66 @@
+"""Queries/sec of Retriever.query in a loop versus Retriever.query_batch.
+
+Run from Backend/:  python -m benchmarks.batch_retrieval [--backend pgvector|memory] [--rounds 3]
+Questions are built from the runbook headings so the set needs no database access. The
+embedding cache is disabled so every round pays for the encoder.
+"""
+import argparse
+import glob
+import os
+import re
+import time
+from embeddings import get_embedding_service
+from retriever import Retriever
+
+RUNBOOK_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runbooks")
+BATCH_SIZES = [1, 8, 32, 128]
+
+
+def runbook_questions():
+    questions = []
+    for path in sorted(glob.glob(os.path.join(RUNBOOK_DIR, "*.md"))):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                match = re.match(r"#{2,4}\s+(?:[\d.]+\s+)?(.+)", line.strip())
+                if match:
+                    heading = re.sub(r"[^\w\s/&-]", "", match.group(1)).strip()
+                    if len(heading.split()) >= 2:
+                        questions.append(f"How do I handle {heading.lower()} in SAP TRM?")
+    return questions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", default=None)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--top-k", type=int, default=10)
+    args = parser.parse_args()
+
+    embedder = get_embedding_service()
+    embedder.cache = None
+    embedder.warmup()
+    retriever = Retriever(backend=args.backend) if args.backend else Retriever()
+    questions = runbook_questions()
+    print(f"backend={retriever.backend}  questions={len(questions)}  top_k={args.top_k}")
+    retriever.query(questions[0], top_k=args.top_k)
+
+    print(f"{'batch':>6} {'loop q/s':>10} {'batch q/s':>10} {'speedup':>8}")
+    for size in BATCH_SIZES:
+        batch = (questions * (size // len(questions) + 1))[:size]
+        loop_time = batch_time = 0.0
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            for q in batch:
+                retriever.query(q, top_k=args.top_k)
+            loop_time += time.perf_counter() - start
+
+            start = time.perf_counter()
+            retriever.query_batch(batch, top_k=args.top_k)
+            batch_time += time.perf_counter() - start
+        loop_qps = size * args.rounds / loop_time
+        batch_qps = size * args.rounds / batch_time
+        print(f"{size:>6} {loop_qps:>10.1f} {batch_qps:>10.1f} {batch_qps / loop_qps:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
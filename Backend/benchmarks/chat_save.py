@@ -0,0 +1,77 @@
+"""Write amplification of POST /chats save modes as a conversation grows.
+
+Run from Backend/:  python -m benchmarks.chat_save [--turns 50] [--user-id N]
+A synthetic conversation (one user and one assistant message per turn) is saved after every
+turn, as the frontend would, with each strategy: replace (delete + re-insert all), append
+with the whole chat, and append with base_count + only the new messages. It reports the rows
+inserted and deleted, write amplification (rows written / messages added), WAL bytes and
+the time per save. The benchmark rows are deleted afterwards.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from async_db import connection
+from chat_store import save_messages
+
+
+def conversation(turns):
+    messages = []
+    for i in range(turns):
+        messages.append({"sender": "user", "text": f"Question {i}: how is the MX.3 end of day batch restarted?"})
+        messages.append({"sender": "system", "text": f"Answer {i}: " + "restart the failed step from the EOD monitor. " * 8})
+    return messages
+
+
+async def run(conn, user_id, messages, strategy):
+    conversation_id = f"bench-{uuid.uuid4()}"
+    inserted = deleted = 0
+    latencies = []
+    start_lsn = await conn.fetchval("SELECT pg_current_wal_lsn()::text")
+    saved = {"count": 0, "last_hash": None}
+    for turn in range(2, len(messages) + 1, 2):
+        start = time.perf_counter()
+        if strategy == "replace":
+            saved = await save_messages(conn, conversation_id, user_id, messages[:turn], mode="replace")
+        elif strategy == "append (whole chat)":
+            saved = await save_messages(conn, conversation_id, user_id, messages[:turn])
+        else:
+            saved = await save_messages(conn, conversation_id, user_id, messages[saved["count"]:turn],
+                                        base_count=saved["count"], base_hash=saved["last_hash"])
+        latencies.append(time.perf_counter() - start)
+        inserted += saved["inserted"]
+        deleted += saved["deleted"]
+    wal = int(await conn.fetchval("SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), $1::pg_lsn)", start_lsn))
+    await conn.execute("DELETE FROM chat_history WHERE conversation_id = $1 AND user_id = $2", conversation_id, user_id)
+
+    ordered = sorted(latencies)
+    p95 = ordered[min(int(0.95 * len(ordered)), len(ordered) - 1)]
+    print(f"{strategy:<22} inserted={inserted:>6} deleted={deleted:>6} "
+          f"amplification={(inserted + deleted) / len(messages):6.1f}x  wal={wal / 1024:9.1f} KiB  "
+          f"save p50={statistics.median(ordered) * 1000:7.2f} ms  p95={p95 * 1000:7.2f} ms")
+
+
+async def benchmark(args):
+    async with connection() as conn:
+        user_id = args.user_id
+        if user_id is None:
+            user_id = await conn.fetchval("SELECT MIN(id) FROM users")
+            if user_id is None:
+                print("No users; sign up once or pass --user-id.")
+                return
+        messages = conversation(args.turns)
+        print(f"turns={args.turns}  messages={len(messages)}  user_id={user_id}")
+        for strategy in ("replace", "append (whole chat)", "append (tail)"):
+            await run(conn, user_id, messages, strategy)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--user-id", type=int, default=None, help="defaults to the first user in the users table")
+    asyncio.run(benchmark(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
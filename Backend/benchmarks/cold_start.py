@@ -0,0 +1,123 @@
+"""Cold-start time of the API: import time of api, then seconds until /health and /ready answer.
+
+Run from Backend/:  python -m benchmarks.cold_start [--runs 3] [--top 10] [--baseline-ref <git ref>]
+Every run uses a fresh interpreter. The import phase runs `python -X importtime -c "import api"`
+and reports the wall time plus the heaviest modules api imports directly (cumulative). The serve phase
+starts uvicorn (stubbed Groq, as in benchmarks.load_test) and polls every 50 ms: liveness
+is the first 200 from /health, readiness the first 200 from /ready (embedder, retrieval
+pipeline and database pool warmed). With --baseline-ref the same is measured on a temporary
+git worktree of that ref, e.g. the commit before lazy startup; refs without /ready show "-".
+Medians over --runs are printed.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import api; print(time.perf_counter() - t)"
+
+
+def import_time(app_dir):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", IMPORT_SNIPPET], cwd=app_dir,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import api failed in {app_dir}:\n{proc.stderr[-2000:]}")
+    modules = {}
+    for line in proc.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:  # modules api imports itself, with their dependencies folded in
+            modules[name.strip()] = int(cumulative) / 1e6
+    return float(proc.stdout.strip().splitlines()[-1]), modules
+
+
+def _status(client, path):
+    try:
+        r = client.get(path)
+    except httpx.HTTPError:
+        return None
+    return r.status_code
+
+
+def serve_times(app_dir, port, timeout):
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.load_test", "--serve", app_dir, "--port", str(port), "--groq-latency-ms", "0"],
+        cwd=BACKEND_DIR
+    )
+    live = ready = None
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=5) as client:
+            while time.perf_counter() - start < timeout:
+                if proc.poll() is not None:
+                    raise RuntimeError(f"server for {app_dir} exited with {proc.returncode}")
+                if live is None and _status(client, "/health") == 200:
+                    live = time.perf_counter() - start
+                if live is not None:
+                    status = _status(client, "/ready")
+                    if status == 404:  # no readiness probe in this tree
+                        break
+                    if status == 200:
+                        ready = time.perf_counter() - start
+                        break
+                time.sleep(0.05)
+    finally:
+        proc.terminate()
+        proc.wait()
+    return live, ready
+
+
+def _fmt(values):
+    values = [v for v in values if v is not None]
+    return f"{statistics.median(values):7.2f} s" if values else "      -  "
+
+
+def measure(label, app_dir, runs, top, port, timeout):
+    imports, lives, readies, modules = [], [], [], {}
+    for _ in range(runs):
+        seconds, per_module = import_time(app_dir)
+        imports.append(seconds)
+        for name, value in per_module.items():
+            modules.setdefault(name, []).append(value)
+        live, ready = serve_times(app_dir, port, timeout)
+        lives.append(live)
+        readies.append(ready)
+    print(f"{label:<9} import api={_fmt(imports)}  /health={_fmt(lives)}  /ready={_fmt(readies)}")
+    heaviest = sorted(modules.items(), key=lambda item: statistics.median(item[1]), reverse=True)[:top]
+    for name, values in heaviest:
+        print(f"{'':<9}   {name:<32} {statistics.median(values) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="heaviest imports of api to list")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds to wait for /ready")
+    parser.add_argument("--baseline-ref", default=None, help="also measure this git ref of the repository")
+    parser.add_argument("--port", type=int, default=8400)
+    args = parser.parse_args()
+
+    targets = [("current", BACKEND_DIR)]
+    worktree = None
+    if args.baseline_ref:
+        worktree = tempfile.mkdtemp(prefix="coldstart-baseline-")
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, args.baseline_ref], cwd=BACKEND_DIR, check=True)
+        targets.insert(0, ("baseline", os.path.join(worktree, os.path.basename(BACKEND_DIR))))
+    try:
+        for label, app_dir in targets:
+            measure(label, app_dir, args.runs, args.top, args.port, args.timeout)
+    finally:
+        if worktree:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=BACKEND_DIR)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Storage size, latency and recall@k of compact (halfvec / binary) first-pass search with rescoring.
+
+Run from Backend/:  python -m benchmarks.compact_vectors [--queries 100] [--k 10] [--shortlists 20 40 80 160]
+Create the compact columns first (python compact_vectors.py --mode halfvec|binary --index hnsw).
+Queries are sampled from stored chunk texts. Exact results are a sequential scan over the
+full-precision embedding; the current layout ("full", using whatever ANN index exists) and
+each compact mode per shortlist size are compared against it.
+"""
+import argparse
+import statistics
+import time
+from benchmarks.ann_recall import run, sample_queries, summarize
+from db import get_pool
+from embeddings import get_embedding_service
+from retriever import Retriever
+import vector_index
+
+
+def run_retriever(retriever, vectors, k):
+    results, latencies = [], []
+    for vec in vectors:
+        start = time.perf_counter()
+        hits = retriever._search_pgvector(vec, k)
+        latencies.append(time.perf_counter() - start)
+        results.append({(h["metadata"]["doc_name"], h["metadata"]["chunk_id"]) for h in hits})
+    return results, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--shortlists", type=int, nargs="+", default=[20, 40, 80, 160])
+    args = parser.parse_args()
+
+    pool = get_pool()
+    embedder = get_embedding_service()
+    with pool.connection() as conn:
+        report = vector_index.storage_report(conn)
+        print(f"table={report['table_bytes']:,} B  total={report['total_bytes']:,} B")
+        for column, size in report["column_bytes"].items():
+            print(f"  column {column:<16} {size:>14,} B")
+        for index, size in report["index_bytes"].items():
+            print(f"  index  {index:<32} {size:>14,} B")
+
+        modes = vector_index.compact_columns(conn)
+        vectors = embedder.encode_queries(sample_queries(conn, args.queries))
+        truth, latencies = run(conn, vectors, args.k, exact=True)
+    summarize("exact (seq scan)", latencies, 1.0)
+
+    def measure(label, retriever):
+        found, latencies = run_retriever(retriever, vectors, args.k)
+        recall = statistics.mean(len(f & t) / max(len(t), 1) for f, t in zip(found, truth))
+        summarize(label, latencies, recall)
+
+    measure("full", Retriever(embedder=embedder, pool=pool, backend="pgvector", storage="full"))
+    if not modes:
+        print("No compact columns; create one with compact_vectors.py to compare.")
+    for mode in modes:
+        for shortlist in args.shortlists:
+            retriever = Retriever(embedder=embedder, pool=pool, backend="pgvector", storage=mode,
+                                  rescore_candidates=shortlist)
+            measure(f"{mode} shortlist={max(shortlist, args.k * 4)}", retriever)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Embedding throughput of each inference backend on the documents in Backend/pdfs/.
+
+Run from Backend/:  python -m benchmarks.embedder_backends [--backends torch torch-int8 onnx onnx-int8]
+                                                           [--model BAAI/bge-large-en-v1.5] [--max-chunks 2000]
+The PDFs and text files are chunked exactly as on upload. Per backend it reports model load
+time, document throughput (chunks/s) and single-query latency; the embedding cache is off.
+"""
+import argparse
+import glob
+import os
+import statistics
+import time
+from embeddings import EmbeddingService, EMBED_BACKENDS, EMBED_MODEL_NAME
+from ingestion import iter_chunks, iter_pdf_pages, iter_text_pages
+
+PDF_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pdfs")
+
+
+def corpus_chunks(limit):
+    chunks = []
+    for path in sorted(glob.glob(os.path.join(PDF_DIR, "*"))):
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".pdf":
+            pages = iter_pdf_pages(path)
+        elif ext == ".txt":
+            pages = iter_text_pages(path)
+        else:
+            continue
+        chunks.extend(text for text, _ in iter_chunks(pages))
+        if len(chunks) >= limit:
+            break
+    return chunks[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=list(EMBED_BACKENDS))
+    parser.add_argument("--model", default=EMBED_MODEL_NAME)
+    parser.add_argument("--max-chunks", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    chunks = corpus_chunks(args.max_chunks)
+    queries = [c[:120] for c in chunks[:args.queries]]
+    print(f"model={args.model}  chunks={len(chunks)}")
+    print(f"{'backend':<11} {'load s':>7} {'chunks/s':>9} {'query p50 ms':>13} {'query p95 ms':>13}")
+
+    for backend in args.backends:
+        service = EmbeddingService(model_name=args.model, backend=backend)
+        service.cache = None
+        start = time.perf_counter()
+        try:
+            service.warmup()
+        except Exception as e:
+            print(f"{backend:<11} unavailable: {e}")
+            continue
+        load = time.perf_counter() - start
+        service.encode_documents(chunks[:8])
+
+        start = time.perf_counter()
+        service.encode_documents(chunks)
+        throughput = len(chunks) / (time.perf_counter() - start)
+
+        latencies = []
+        for q in queries:
+            start = time.perf_counter()
+            service.encode_queries([q])
+            latencies.append(time.perf_counter() - start)
+        ordered = sorted(latencies)
+        p95 = ordered[min(int(0.95 * len(ordered)), len(ordered) - 1)]
+        print(f"{backend:<11} {load:>7.1f} {throughput:>9.1f} "
+              f"{statistics.median(ordered) * 1000:>13.1f} {p95 * 1000:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Accuracy drift of an embedding backend against the fp32 vectors stored in doc_chunks.
+
+Run from Backend/:  python -m benchmarks.embedding_drift --backend onnx-int8 [--sample 500] [--queries 100] [--k 10]
+A random sample of chunks is re-encoded with the candidate backend and compared with the
+stored vectors (cosine agreement). Retrieval over the sample is compared with top-k
+overlap against the reference (stored vectors, fp32 torch queries), both for a full
+re-embed (candidate documents + queries) and for swapping only the query encoder.
+"""
+import argparse
+import statistics
+import numpy as np
+from db import get_pool
+from embeddings import EmbeddingService, EMBED_BACKENDS, EMBED_MODEL_NAME
+
+
+def sample_chunks(conn, n):
+    with conn.cursor() as cur:
+        cur.execute("SELECT chunk_text, embedding::real[] FROM doc_chunks ORDER BY random() LIMIT %s", (n,))
+        rows = cur.fetchall()
+    conn.rollback()
+    return [text for text, _ in rows], np.asarray([emb for _, emb in rows], dtype=np.float32)
+
+
+def topk(queries, corpus, k):
+    scores = queries @ corpus.T
+    return [set(np.argsort(-row)[:k]) for row in scores]
+
+
+def overlap(found, truth):
+    return statistics.mean(len(f & t) / len(t) for f, t in zip(found, truth))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backend", required=True, choices=EMBED_BACKENDS)
+    parser.add_argument("--model", default=EMBED_MODEL_NAME)
+    parser.add_argument("--sample", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    with get_pool().connection() as conn:
+        texts, stored = sample_chunks(conn, args.sample)
+    if not texts:
+        print("doc_chunks is empty.")
+        return
+    query_texts = [t[:160] for t in texts[:args.queries]]
+
+    reference = EmbeddingService(model_name=args.model, backend="torch")
+    candidate = EmbeddingService(model_name=args.model, backend=args.backend)
+    reference.cache = candidate.cache = None
+
+    docs = candidate.encode_documents(texts)
+    if docs.shape[1] != stored.shape[1]:
+        print(f"Dimension mismatch: stored {stored.shape[1]}, candidate {docs.shape[1]}; "
+              "only a full re-embed (reembed.py) can switch to this model.")
+        return
+    cosine = np.sum(docs * stored, axis=1) / (np.linalg.norm(docs, axis=1) * np.linalg.norm(stored, axis=1))
+    print(f"chunks={len(texts)}  backend={args.backend}")
+    print(f"cosine vs stored   mean={cosine.mean():.5f}  p5={np.percentile(cosine, 5):.5f}  min={cosine.min():.5f}")
+
+    truth = topk(reference.encode_queries(query_texts), stored, args.k)
+    candidate_queries = candidate.encode_queries(query_texts)
+    print(f"top-{args.k} overlap, full re-embed       {overlap(topk(candidate_queries, docs, args.k), truth):.4f}")
+    print(f"top-{args.k} overlap, query encoder only  {overlap(topk(candidate_queries, stored, args.k), truth):.4f}")
+
+
+if __name__ == "__main__":
+    main()
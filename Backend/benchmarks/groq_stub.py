@@ -0,0 +1,74 @@
+"""Drop-in stand-in for the groq package, used by the load benchmarks so no API calls are made.
+
+install() must run before qa_gemini is imported. Completions sleep for a fixed latency and
+return canned text: a GENERAL_QUERY verdict for the intent prompt, the question itself for
+the condense prompt and a short answer otherwise (streamed as a few deltas when stream=True).
+"""
+import asyncio
+import sys
+import time
+import types
+
+ANSWER = "Restart the failed step from the end-of-day monitor once the upstream feed is complete."
+
+
+def _reply(messages):
+    system = messages[0]["content"] if messages else ""
+    if "Intent Classifier" in system:
+        return "INTENT: GENERAL_QUERY"
+    if "standalone" in system:
+        return messages[-1]["content"]
+    return ANSWER
+
+
+def _completion(text):
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=text))])
+
+
+def _delta(text):
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(delta=types.SimpleNamespace(content=text))])
+
+
+class _Completions:
+    def __init__(self, latency, is_async):
+        self.latency = latency
+        self.is_async = is_async
+
+    def create(self, model=None, messages=(), stream=False, **kwargs):
+        text = _reply(list(messages))
+        if not self.is_async:
+            time.sleep(self.latency)
+            return _completion(text)
+        if stream:
+            return self._stream(text)
+        return self._complete(text)
+
+    async def _complete(self, text):
+        await asyncio.sleep(self.latency)
+        return _completion(text)
+
+    async def _stream(self, text):
+        words = text.split(" ")
+
+        async def deltas():
+            for i, word in enumerate(words):
+                await asyncio.sleep(self.latency / len(words))
+                yield _delta(word if i == 0 else " " + word)
+        return deltas()
+
+
+def install(latency_ms=400):
+    latency = latency_ms / 1000.0
+    module = types.ModuleType("groq")
+
+    class Groq:
+        def __init__(self, **kwargs):
+            self.chat = types.SimpleNamespace(completions=_Completions(latency, False))
+
+    class AsyncGroq:
+        def __init__(self, **kwargs):
+            self.chat = types.SimpleNamespace(completions=_Completions(latency, True))
+
+    module.Groq, module.AsyncGroq = Groq, AsyncGroq
+    sys.modules["groq"] = module
+    return module
@@ -0,0 +1,87 @@
+"""Hit rate and latency of hybrid (vector + full-text, RRF) retrieval against vector-only search.
+
+Run from Backend/:  python -m benchmarks.hybrid_retrieval [--k 5] [--rounds 3]
+The labelled set is built from the runbooks: every transaction code they mention (TBB1,
+OT84, FTR_CREATE, ...) becomes a few questions, and the relevant chunks are the rows of
+doc_chunks whose text contains that code. Reports hit@k, MRR and p50/p95 latency per mode.
+The runbooks must have been ingested (upload_runbooks.py) first.
+"""
+import argparse
+import glob
+import os
+import re
+import statistics
+import time
+from db import get_pool
+from retriever import Retriever
+from schema import ensure_schema
+
+RUNBOOK_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runbooks")
+CODE_PATTERN = re.compile(r"\b(?:[A-Z]{2,}[0-9]+[A-Z0-9]*|[A-Z]+_[A-Z0-9_]+)\b")
+TEMPLATES = [
+    "How do I use transaction {}?",
+    "What is {} used for?",
+    "Steps in {}",
+]
+
+
+def runbook_codes():
+    codes = set()
+    for path in glob.glob(os.path.join(RUNBOOK_DIR, "*.md")):
+        with open(path, "r", encoding="utf-8") as f:
+            codes.update(CODE_PATTERN.findall(f.read()))
+    return sorted(codes)
+
+
+def labelled_queries(conn, codes):
+    rows = []
+    with conn.cursor() as cur:
+        for code in codes:
+            cur.execute("SELECT doc_name, chunk_id, chunk_text FROM doc_chunks WHERE chunk_text ILIKE %s",
+                        (f"%{code}%",))
+            boundary = re.compile(rf"\b{re.escape(code)}\b")
+            relevant = {(d, c) for d, c, text in cur.fetchall() if boundary.search(text)}
+            if relevant:
+                rows.extend((template.format(code), relevant) for template in TEMPLATES)
+    conn.rollback()
+    return rows
+
+
+def evaluate(retriever, queries, k, mode, rounds):
+    latencies, hits, reciprocal_ranks = [], 0, []
+    for query, relevant in queries:
+        for _ in range(rounds):
+            start = time.perf_counter()
+            results = retriever.query(query, top_k=k, mode=mode)
+            latencies.append(time.perf_counter() - start)
+        ranks = [i for i, h in enumerate(results, start=1) if (h["doc_name"], h["chunk_id"]) in relevant]
+        hits += bool(ranks)
+        reciprocal_ranks.append(1.0 / ranks[0] if ranks else 0.0)
+    ordered = sorted(latencies)
+    p95 = ordered[min(int(0.95 * len(ordered)), len(ordered) - 1)]
+    print(f"{mode:<7} hit@{k}={hits / len(queries):6.3f}  MRR={statistics.mean(reciprocal_ranks):6.3f}  "
+          f"p50={statistics.median(ordered) * 1000:8.2f} ms  p95={p95 * 1000:8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with get_pool().connection() as conn:
+        ensure_schema(conn)  # the full-text index, if no API process has started since it was added
+        queries = labelled_queries(conn, runbook_codes())
+    if not queries:
+        print("No runbook transaction codes found in doc_chunks; ingest the runbooks first.")
+        return
+    print(f"queries={len(queries)}  k={args.k}")
+
+    retriever = Retriever()
+    retriever.query(queries[0][0], top_k=args.k, mode="hybrid")  # warm up model, pool and prepared statements
+    for mode in ("vector", "hybrid"):
+        evaluate(retriever, queries, args.k, mode, args.rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""Accuracy and latency of the local intent classifier against the LLM classifier.
+
+Run from Backend/:  python -m benchmarks.intent_classifier [--limit 200] [--offline]
+The evaluation set pairs every runbook heading with a procedural phrasing ("How do I ...")
+and an explanatory one ("What is ..."). Labels come from the LLM classifier, or from the
+phrasing template with --offline (no network). The local model is trained from the
+built-in examples only, so the set is unseen, and nothing is logged. The embedding cache
+is disabled so local latency includes encoding the query.
+"""
+import argparse
+import glob
+import os
+import re
+import statistics
+import tempfile
+import time
+from embeddings import get_embedding_service
+from intent_classifier import IntentClassifier, RUNBOOK, GENERAL
+
+RUNBOOK_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runbooks")
+TEMPLATES = [
+    ("How do I perform {}?", RUNBOOK),
+    ("What are the steps for {}?", RUNBOOK),
+    ("What is {}?", GENERAL),
+    ("Explain {} briefly", GENERAL),
+]
+
+
+def evaluation_set(limit):
+    topics = []
+    for path in sorted(glob.glob(os.path.join(RUNBOOK_DIR, "*.md"))):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                match = re.match(r"#{2,4}\s+(?:[\d.]+\s+)?(.+)", line.strip())
+                if match:
+                    topic = re.sub(r"[^\w\s/&-]", "", match.group(1)).strip().lower()
+                    if len(topic.split()) >= 2 and topic not in topics:
+                        topics.append(topic)
+    rows = [(template.format(topic), label) for topic in topics for template, label in TEMPLATES]
+    return rows[:limit]
+
+
+def percentiles(latencies):
+    ordered = sorted(latencies)
+    p95 = ordered[min(int(0.95 * len(ordered)), len(ordered) - 1)]
+    return f"p50={statistics.median(ordered) * 1000:8.2f} ms  p95={p95 * 1000:8.2f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--offline", action="store_true", help="use template labels instead of calling the LLM")
+    args = parser.parse_args()
+
+    rows = evaluation_set(args.limit)
+    embedder = get_embedding_service()
+    embedder.cache = None  # local latency includes encoding the query
+    embedder.warmup()
+    workdir = tempfile.mkdtemp()
+    classifier = IntentClassifier(embedder=embedder, log_path=None, model_path=os.path.join(workdir, "intent_model.npz"),
+                                  cache_size=0)
+    start = time.perf_counter()
+    n = classifier.train()
+    print(f"trained on {n} examples in {time.perf_counter() - start:.2f}s; threshold={classifier.threshold}")
+
+    llm_latencies = []
+    if args.offline:
+        labels = [label for _, label in rows]
+    else:
+        from qa_gemini import get_client, CLASSIFY_MODEL, _classify_messages, _parse_intent
+        labels = []
+        for query, _ in rows:
+            start = time.perf_counter()
+            response = get_client().chat.completions.create(
+                model=CLASSIFY_MODEL, messages=_classify_messages(query), temperature=0.0, max_tokens=60
+            )
+            llm_latencies.append(time.perf_counter() - start)
+            labels.append(_parse_intent(response.choices[0].message.content.strip())[0])
+
+    local_latencies, confident, confident_correct, forced_correct = [], 0, 0, 0
+    for (query, _), label in zip(rows, labels):
+        start = time.perf_counter()
+        p = classifier.probability(query)
+        local_latencies.append(time.perf_counter() - start)
+        predicted = RUNBOOK if p >= 0.5 else GENERAL
+        forced_correct += predicted == label
+        if max(p, 1.0 - p) >= classifier.threshold:
+            confident += 1
+            confident_correct += predicted == label
+
+    total = len(rows)
+    print(f"queries={total}  labels={'template' if args.offline else 'llm'}")
+    print(f"local accuracy (all)          {forced_correct / total:6.3f}")
+    print(f"local coverage (>= threshold) {confident / total:6.3f}")
+    print(f"local accuracy (covered)      {confident_correct / max(confident, 1):6.3f}")
+    # uncovered queries go to the LLM, which agrees with itself by definition
+    print(f"hybrid agreement with LLM     {(confident_correct + total - confident) / total:6.3f}")
+    print(f"local latency  {percentiles(local_latencies)}")
+    if llm_latencies:
+        print(f"llm latency    {percentiles(llm_latencies)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""Load test of the API with a stubbed Groq client: latency percentiles and requests/s per concurrency.
+
+Run from Backend/ (local Postgres with ingested documents; Groq is never called):
+    python -m benchmarks.load_test [--concurrency 10 50 200] [--duration 20] [--baseline-ref <git ref>]
+                                   [--mix ask=6,chats=2,messages=1,save=1,login=1] [--groq-latency-ms 400]
+The API runs in a subprocess (uvicorn, one worker) from this tree and, with --baseline-ref,
+from a temporary git worktree of that ref (e.g. the commit before the async handlers), so
+both designs are measured against the same database and stub. Each client loops over the
+weighted request mix for --duration seconds; p50/p99 and requests/s are reported overall
+and per endpoint. The answer cache is disabled in the servers so every /ask runs the
+pipeline. Use --url to load an already running server instead. A throwaway user is signed
+up for the run and deleted with its chats afterwards.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+import httpx
+from benchmarks import groq_stub
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "load-test-password"
+DEFAULT_MIX = "ask=6,chats=2,messages=1,save=1,login=1"
+
+
+def serve(app_dir, port, groq_latency_ms):
+    """Subprocess entry point: stub Groq, then serve api:app from app_dir."""
+    groq_stub.install(groq_latency_ms)
+    app_dir = os.path.abspath(app_dir)
+    sys.path = [app_dir] + [p for p in sys.path if p and os.path.abspath(p) != BACKEND_DIR]
+    os.chdir(app_dir)
+    import uvicorn
+    uvicorn.run("api:app", host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_server(app_dir, port, groq_latency_ms, env=None):
+    env = dict(os.environ, ANSWER_CACHE_ENABLED="false", **(env or {}))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.load_test", "--serve", app_dir, "--port", str(port),
+         "--groq-latency-ms", str(groq_latency_ms)],
+        cwd=BACKEND_DIR, env=env
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 600  # first start loads the embedding model
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server for {app_dir} exited with {proc.returncode}")
+        try:
+            if httpx.get(f"{url}/health", timeout=2).status_code == 200:
+                return proc, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(1)
+    proc.terminate()
+    raise RuntimeError(f"server for {app_dir} did not become healthy")
+
+
+def servers(baseline_ref, port, groq_latency_ms, env=None):
+    """Yield (label, url) for a server of this tree, preceded by one of baseline_ref when given;
+    each server is stopped before the next one starts."""
+    targets = [("current", BACKEND_DIR)]
+    worktree = None
+    if baseline_ref:
+        worktree = tempfile.mkdtemp(prefix="loadtest-baseline-")
+        subprocess.run(["git", "worktree", "add", "--detach", worktree, baseline_ref], cwd=BACKEND_DIR, check=True)
+        targets.insert(0, ("baseline", os.path.join(worktree, os.path.basename(BACKEND_DIR))))
+    try:
+        for i, (label, app_dir) in enumerate(targets):
+            proc, url = start_server(app_dir, port + i, groq_latency_ms, env)
+            try:
+                yield label, url
+            finally:
+                proc.terminate()
+                proc.wait()
+    finally:
+        if worktree:
+            subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=BACKEND_DIR)
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class Session:
+    """A signed-up user with a few saved chats to list and page through."""
+
+    def __init__(self, client, questions):
+        self.client = client
+        self.questions = questions
+        self.username = f"loadtest_{uuid.uuid4().hex[:10]}"
+        self.user_id = None
+        self.chat_ids = []
+
+    async def setup(self, chats=5):
+        r = await self.client.post("/signup", json={"username": self.username, "email": f"{self.username}@example.com",
+                                                    "password": PASSWORD})
+        r.raise_for_status()
+        self.user_id = r.json()["user_id"]
+        for i in range(chats):
+            chat_id = f"load-{uuid.uuid4().hex[:8]}"
+            messages = []
+            for q in self.questions[i * 4:(i + 1) * 4]:
+                messages += [{"sender": "user", "text": q}, {"sender": "system", "text": groq_stub.ANSWER}]
+            r = await self.client.post("/chats", json={"id": chat_id, "user_id": self.user_id, "messages": messages})
+            r.raise_for_status()
+            self.chat_ids.append(chat_id)
+
+    async def supports_messages(self):
+        r = await self.client.get(f"/chats/{self.chat_ids[0]}/messages", params={"user_id": self.user_id})
+        return r.status_code == 200
+
+    def request(self, kind, client_no):
+        if kind == "ask":
+            return self.client.post("/ask", json={"query": random.choice(self.questions), "user_id": self.user_id,
+                                                  "conversation_id": f"load-ask-{client_no}"})
+        if kind == "chats":
+            return self.client.get("/chats", params={"user_id": self.user_id})
+        if kind == "messages":
+            return self.client.get(f"/chats/{random.choice(self.chat_ids)}/messages", params={"user_id": self.user_id})
+        if kind == "save":
+            chat_id = random.choice(self.chat_ids)
+            return self.client.post("/chats", json={"id": f"{chat_id}-{client_no}", "user_id": self.user_id, "messages": [
+                {"sender": "user", "text": random.choice(self.questions)}, {"sender": "system", "text": groq_stub.ANSWER}]})
+        if kind == "login":
+            return self.client.post("/login", json={"username_or_email": self.username, "password": PASSWORD})
+        raise ValueError(f"Unknown request kind '{kind}'")
+
+    async def cleanup(self):
+        from db import get_pool
+
+        with get_pool().connection() as conn, conn.cursor() as cur:
+            cur.execute("DELETE FROM chat_history WHERE user_id = %s", (self.user_id,))
+            cur.execute("DELETE FROM users WHERE id = %s", (self.user_id,))
+            conn.commit()
+
+
+async def run_level(session, mix, concurrency, duration):
+    kinds, weights = list(mix), list(mix.values())
+    samples = {kind: [] for kind in kinds}
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def client(no):
+        nonlocal errors
+        while time.monotonic() < deadline:
+            kind = random.choices(kinds, weights)[0]
+            start = time.perf_counter()
+            try:
+                r = await session.request(kind, no)
+                ok = r.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                samples[kind].append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    return samples, errors, time.perf_counter() - start
+
+
+def pct(values, p):
+    ordered = sorted(values)
+    return ordered[min(int(p * len(ordered)), len(ordered) - 1)] if ordered else float("nan")
+
+
+def report(label, concurrency, samples, errors, elapsed):
+    everything = [s for values in samples.values() for s in values]
+    print(f"{label:<10} c={concurrency:<4} rps={len(everything) / elapsed:8.1f}  "
+          f"p50={pct(everything, 0.5) * 1000:8.1f} ms  p99={pct(everything, 0.99) * 1000:8.1f} ms  errors={errors}")
+    for kind, values in samples.items():
+        if values:
+            print(f"{'':<10}   {kind:<9} n={len(values):<6} p50={statistics.median(values) * 1000:8.1f} ms  "
+                  f"p99={pct(values, 0.99) * 1000:8.1f} ms")
+
+
+async def load(label, url, mix, levels, duration):
+    # imported here: the --serve subprocess must not import this tree's modules before api
+    from benchmarks.batch_retrieval import runbook_questions
+
+    questions = runbook_questions()
+    limits = httpx.Limits(max_connections=max(levels), max_keepalive_connections=max(levels))
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+        session = Session(client, questions)
+        await session.setup()
+        try:
+            if "messages" in mix and not await session.supports_messages():
+                print(f"{label}: no /chats/{{id}}/messages endpoint; dropped from the mix")
+                mix = {k: v for k, v in mix.items() if k != "messages"}
+            await session.request("ask", 0)  # warm the pipeline
+            for concurrency in levels:
+                report(label, concurrency, *await run_level(session, mix, concurrency, duration))
+        finally:
+            await session.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--groq-latency-ms", type=float, default=400)
+    parser.add_argument("--baseline-ref", default=None, help="also load-test this git ref of the repository")
+    parser.add_argument("--url", default=None, help="load an already running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--serve", metavar="APP_DIR", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port, args.groq_latency_ms)
+        return
+    mix = parse_mix(args.mix)
+    if args.url:
+        asyncio.run(load("server", args.url, mix, args.concurrency, args.duration))
+        return
+
+    for label, url in servers(args.baseline_ref, args.port, args.groq_latency_ms):
+        asyncio.run(load(label, url, mix, args.concurrency, args.duration))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Login throughput and /ask tail latency while a burst of logins runs alongside /ask traffic.
+
+Run from Backend/:  python -m benchmarks.login_load [--ask-clients 20] [--login-clients 0 20 100]
+                                                    [--rounds 10 12] [--duration 20] [--baseline-ref <git ref>]
+A server is started per BCRYPT_ROUNDS value (stubbed Groq and a throwaway user, as in
+benchmarks.load_test). At each login concurrency a fixed number of /ask clients run
+alongside the login clients. It reports logins/s, login p50/p99, rejected logins (503 from
+the bounded bcrypt queue) and /ask p50/p99. Commits before passwords.py ignore --rounds
+and always hash at bcrypt's default cost.
+"""
+import argparse
+import asyncio
+import httpx
+from benchmarks.load_test import Session, run_level, pct, servers
+
+
+async def measure(label, url, ask_clients, login_levels, duration):
+    from benchmarks.batch_retrieval import runbook_questions
+
+    limits = httpx.Limits(max_connections=ask_clients + max(login_levels))
+    async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+        session = Session(client, runbook_questions())
+        await session.setup(chats=1)
+        try:
+            await session.request("ask", 0)  # warm the pipeline
+            for logins in login_levels:
+                runs = [run_level(session, {"ask": 1}, ask_clients, duration)]
+                if logins:
+                    runs.append(run_level(session, {"login": 1}, logins, duration))
+                results = await asyncio.gather(*runs)
+                ask_samples = results[0][0]["ask"]
+                login_samples, rejected, elapsed = results[1] if logins else ({"login": []}, 0, duration)
+                login_samples = login_samples["login"]
+                print(f"{label:<16} logins={logins:<4} login/s={len(login_samples) / elapsed:7.1f}  "
+                      f"login p50={pct(login_samples, 0.5) * 1000:8.1f} ms  p99={pct(login_samples, 0.99) * 1000:8.1f} ms  "
+                      f"rejected={rejected:<5} ask p50={pct(ask_samples, 0.5) * 1000:8.1f} ms  "
+                      f"p99={pct(ask_samples, 0.99) * 1000:8.1f} ms")
+        finally:
+            await session.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ask-clients", type=int, default=20)
+    parser.add_argument("--login-clients", type=int, nargs="+", default=[0, 20, 100])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[12])
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--groq-latency-ms", type=float, default=400)
+    parser.add_argument("--baseline-ref", default=None, help="also measure this git ref of the repository")
+    parser.add_argument("--port", type=int, default=8200)
+    args = parser.parse_args()
+
+    for rounds in args.rounds:
+        for label, url in servers(args.baseline_ref, args.port, args.groq_latency_ms, env={"BCRYPT_ROUNDS": str(rounds)}):
+            asyncio.run(measure(f"{label} r={rounds}", url, args.ask_clients, args.login_clients, args.duration))
+
+
+if __name__ == "__main__":
+    main()
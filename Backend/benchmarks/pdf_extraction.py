@@ -0,0 +1,83 @@
+"""Compare legacy whole-document PDF extraction against the streaming page extractor.
+
+Run from Backend/:  python -m benchmarks.pdf_extraction [--workers N] [pdf ...]
+Each measurement runs in a fresh interpreter so peak RSS is not shared between runs;
+peak RSS is the parent's plus the largest extraction worker's.
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+PDF_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pdfs")
+
+
+def _peak_rss_mb():
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return (own + children) / 1024.0
+
+
+def _measure(mode, path, workers):
+    import ingestion
+
+    start = time.perf_counter()
+    if mode == "legacy":
+        from PyPDF2 import PdfReader
+        text = ingestion.extract_pdf_text(path)
+        pages = len(PdfReader(path).pages)
+        chunks = len(ingestion.split_chunks(text))
+    else:
+        pages, chunks, seen = 0, 0, set()
+        for _, page in ingestion.iter_chunks(_counting(ingestion.iter_pdf_pages(path, workers=workers), seen)):
+            chunks += 1
+        pages = len(seen)
+        if ingestion._pdf_pool is not None:
+            # reap the workers so their peak RSS shows up in RUSAGE_CHILDREN
+            ingestion._pdf_pool.shutdown()
+    elapsed = time.perf_counter() - start
+    return {"pages": pages, "chunks": chunks, "seconds": elapsed, "peak_rss_mb": _peak_rss_mb()}
+
+
+def _counting(pages, seen):
+    for page_number, text in pages:
+        seen.add(page_number)
+        yield page_number, text
+
+
+def run_isolated(mode, path, workers):
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.pdf_extraction", "--child", mode, "--workers", str(workers), path],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(PDF_DIR)
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pdfs", nargs="*")
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--child", choices=["legacy", "streaming"])
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_measure(args.child, args.pdfs[0], args.workers or None)))
+        return
+
+    pdfs = args.pdfs or sorted(glob.glob(os.path.join(PDF_DIR, "*.pdf")))
+    print(f"{'document':<32} {'mode':<10} {'pages':>6} {'chunks':>7} {'sec':>8} {'pages/s':>9} {'peak MB':>9}")
+    for path in pdfs:
+        for mode in ("legacy", "streaming"):
+            r = run_isolated(mode, path, args.workers)
+            rate = r["pages"] / r["seconds"] if r["seconds"] else 0.0
+            print(f"{os.path.basename(path)[:32]:<32} {mode:<10} {r['pages']:>6} {r['chunks']:>7} "
+                  f"{r['seconds']:>8.2f} {rate:>9.1f} {r['peak_rss_mb']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Cost of the cross-encoder rerank stage and the prompt tokens it saves.
+
+Run from Backend/:  python -m benchmarks.rerank [--backends torch onnx] [--pairs 5 10 20 30]
+Passages are runbook chunks (same splitter settings as ingestion) and the questions come
+from the runbook headings, so no database is needed. For each backend it reports the
+batched forward-pass latency per pair count, then the context tokens for the top-10
+passages by embedding similarity versus the reranked top RERANK_TOP_N.
+"""
+import argparse
+import glob
+import os
+import statistics
+import time
+import numpy as np
+from benchmarks.batch_retrieval import runbook_questions
+from context_builder import assemble_context
+from embeddings import get_embedding_service
+from ingestion import split_chunks
+from reranker import Reranker, RERANK_TOP_N
+
+RUNBOOK_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runbooks")
+
+
+def runbook_passages():
+    passages = []
+    for path in sorted(glob.glob(os.path.join(RUNBOOK_DIR, "*.md"))):
+        with open(path, "r", encoding="utf-8") as f:
+            name = os.path.basename(path)
+            passages.extend((name, i, text) for i, text in enumerate(split_chunks(f.read())))
+    return passages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx"])
+    parser.add_argument("--pairs", type=int, nargs="+", default=[5, 10, 20, 30])
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=30)
+    args = parser.parse_args()
+
+    passages = runbook_passages()
+    questions = runbook_questions()[:args.questions]
+    embedder = get_embedding_service()
+    passage_vectors = embedder.encode_documents([p[2] for p in passages])
+    question_vectors = embedder.encode_queries(questions)
+    candidates = []
+    for q, qv in zip(questions, question_vectors):
+        sims = passage_vectors @ qv
+        top = np.argsort(-sims)[:10]
+        candidates.append((q, [
+            {"doc_name": passages[i][0], "chunk_id": passages[i][1], "text": passages[i][2], "score": float(1 - sims[i])}
+            for i in top
+        ]))
+    print(f"passages={len(passages)}  questions={len(questions)}")
+
+    for backend in args.backends:
+        reranker = Reranker(backend=backend, budget_ms=0)  # no budget: measure the full pass
+        if reranker.model is None:
+            continue
+        reranker.warmup()
+        print(f"backend={reranker.backend}")
+        for n in args.pairs:
+            latencies = []
+            for i in range(args.rounds):
+                q, hits = candidates[i % len(candidates)]
+                pool = (hits * (n // len(hits) + 1))[:n]
+                start = time.perf_counter()
+                reranker.rerank(q, pool, top_n=RERANK_TOP_N)
+                latencies.append(time.perf_counter() - start)
+            ordered = sorted(latencies)
+            p95 = ordered[min(int(0.95 * len(ordered)), len(ordered) - 1)]
+            print(f"  pairs={n:<3} p50={statistics.median(ordered) * 1000:8.2f} ms  p95={p95 * 1000:8.2f} ms")
+
+        before, after = [], []
+        for q, hits in candidates:
+            before.append(assemble_context(hits, budget=10 ** 6)[2]["tokens_used"])
+            after.append(assemble_context(reranker.rerank(q, hits), budget=10 ** 6)[2]["tokens_used"])
+        print(f"  context tokens: top-10 avg={statistics.mean(before):.0f}  "
+              f"reranked top-{RERANK_TOP_N} avg={statistics.mean(after):.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Startup time and memory of the gunicorn deployment at 1, 4 and 8 workers, per model-sharing mode.
+
+Run from Backend/:  python -m benchmarks.workers [--workers 1 4 8] [--modes per-worker preload sidecar]
+Each run starts gunicorn -c gunicorn.conf.py (stubbed Groq, GUNICORN_WARM_WORKERS so workers load
+before they accept connections) and
+times until /health has answered from every worker, i.e. every worker has its embedding
+model (or sidecar connection) ready. Memory is read from /proc once the workers are up:
+PSS summed over master, workers and sidecar (shared pages are split between the processes
+sharing them, so the total is what the deployment really costs) plus mean RSS and PSS per
+worker. Modes:
+  per-worker  every worker loads its own copy of the weights
+  preload     the master loads the weights before forking (GUNICORN_PRELOAD_MODEL)
+  sidecar     one embedding_server.py owns the weights (EMBED_SOCKET)
+Linux only (/proc/<pid>/smaps_rollup).
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+from benchmarks import groq_stub
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = {
+    "per-worker": {"GUNICORN_PRELOAD_MODEL": "false"},
+    "preload": {"GUNICORN_PRELOAD_MODEL": "true"},
+    "sidecar": {"GUNICORN_PRELOAD_MODEL": "false"},
+}
+
+
+def serve(workers, port):
+    """Subprocess entry point: stub Groq, then run gunicorn in this process (it becomes the master)."""
+    groq_stub.install()
+    from gunicorn.app.wsgiapp import run
+
+    sys.argv = ["gunicorn", "-c", "gunicorn.conf.py", "--workers", str(workers),
+                "--bind", f"127.0.0.1:{port}", "api:app"]
+    run()
+
+
+def _children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+
+def _memory_kb(pid):
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                key, _, rest = line.partition(":")
+                if key in ("Rss", "Pss"):
+                    values[key] = int(rest.split()[0])
+    except OSError:
+        pass
+    return values.get("Rss", 0), values.get("Pss", 0)
+
+
+def _worker_pids_seen(url, expected, timeout):
+    seen = set()
+    deadline = time.monotonic() + timeout
+
+    def probe(_):
+        # a fresh connection per request, so the kernel can hand it to any worker
+        try:
+            return httpx.get(f"{url}/health", timeout=2).json().get("worker")
+        except (httpx.HTTPError, ValueError):
+            return None
+
+    with ThreadPoolExecutor(max_workers=2 * expected) as pool:
+        while len(seen) < expected and time.monotonic() < deadline:
+            seen.update(pid for pid in pool.map(probe, range(2 * expected)) if pid)
+            time.sleep(0.05)
+    return seen
+
+
+def measure(mode, workers, port, timeout):
+    env = dict(os.environ, GUNICORN_WARM_WORKERS="true", **MODES[mode])
+    socket_dir = None
+    if mode == "sidecar":
+        socket_dir = tempfile.mkdtemp(prefix="embed-sock-")
+        env["EMBED_SOCKET"] = os.path.join(socket_dir, "embed.sock")
+    else:
+        env.pop("EMBED_SOCKET", None)
+
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-m", "benchmarks.workers", "--serve", str(workers), "--port", str(port)],
+                            cwd=BACKEND_DIR, env=env)
+    try:
+        url = f"http://127.0.0.1:{port}"
+        seen = _worker_pids_seen(url, workers, timeout)
+        startup = time.perf_counter() - start
+        if len(seen) < workers:
+            print(f"{mode:<11} workers={workers:<2} only {len(seen)} workers answered within {timeout:.0f}s")
+            return
+
+        worker_pids = [pid for pid in _children(proc.pid) if pid in seen]
+        other_pids = [proc.pid] + [pid for pid in _children(proc.pid) if pid not in seen]  # master, sidecar
+        worker_mem = [_memory_kb(pid) for pid in worker_pids]
+        total_pss = sum(pss for _, pss in worker_mem) + sum(_memory_kb(pid)[1] for pid in other_pids)
+        print(f"{mode:<11} workers={workers:<2} startup={startup:7.1f} s  total PSS={total_pss / 1024:8.0f} MiB  "
+              f"per worker RSS={sum(r for r, _ in worker_mem) / len(worker_mem) / 1024:7.0f} MiB  "
+              f"PSS={sum(p for _, p in worker_mem) / len(worker_mem) / 1024:7.0f} MiB")
+    finally:
+        proc.terminate()
+        proc.wait()
+        if socket_dir:
+            shutil.rmtree(socket_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--timeout", type=float, default=900, help="seconds to wait for every worker")
+    parser.add_argument("--port", type=int, default=8300)
+    parser.add_argument("--serve", type=int, metavar="WORKERS", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.port)
+        return
+    for mode in args.modes:
+        for workers in args.workers:
+            measure(mode, workers, args.port, args.timeout)
+
+
+if __name__ == "__main__":
+    main()
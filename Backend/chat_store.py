@@ -0,0 +1,97 @@
+import hashlib
+import metrics
+
+SAVE_MODES = ("append", "replace")
+
+# One statement for any number of messages; ids follow array order and clock_timestamp()
+# keeps created_at increasing within the statement
+INSERT_SQL = """
+    INSERT INTO chat_history (conversation_id, user_id, role, content, created_at)
+    SELECT $1, $2, m.role, m.content, clock_timestamp()
+    FROM unnest($3::text[], $4::text[]) WITH ORDINALITY AS m(role, content, ord)
+    ORDER BY m.ord
+"""
+
+STATE_SQL = """
+    SELECT COUNT(*) AS count,
+           (SELECT role FROM chat_history WHERE user_id = $1 AND conversation_id = $2 ORDER BY id DESC LIMIT 1) AS role,
+           (SELECT content FROM chat_history WHERE user_id = $1 AND conversation_id = $2 ORDER BY id DESC LIMIT 1) AS content
+    FROM chat_history WHERE user_id = $1 AND conversation_id = $2
+"""
+
+
+class ChatConflict(Exception):
+    """The client's base_count/base_hash does not match what is stored for the conversation."""
+
+    def __init__(self, count, last_hash):
+        super().__init__(f"conversation has {count} stored messages (last hash {last_hash})")
+        self.count = count
+        self.last_hash = last_hash
+
+
+def message_fields(msg):
+    # Handle both dict and object formats
+    if isinstance(msg, dict):
+        return msg.get("sender", "user"), msg.get("text", "")
+    return getattr(msg, "sender", "user"), getattr(msg, "text", "")
+
+
+def message_hash(role, content):
+    return hashlib.sha1(f"{role}\x00{content}".encode("utf-8")).hexdigest()[:16]
+
+
+async def insert_messages(conn, conversation_id, user_id, rows):
+    """Insert (role, content) rows in order with a single multi-row INSERT."""
+    if rows:
+        await conn.execute(INSERT_SQL, conversation_id, user_id,
+                           [role for role, _ in rows], [content for _, content in rows])
+
+
+async def _stored_state(conn, conversation_id, user_id):
+    # serialize concurrent saves of the same conversation so the tail is computed once
+    await conn.execute("SELECT pg_advisory_xact_lock(hashtext($1))", f"chat:{user_id}:{conversation_id}")
+    row = await conn.fetchrow(STATE_SQL, user_id, conversation_id)
+    return row["count"], (message_hash(row["role"], row["content"]) if row["count"] else None)
+
+
+async def save_messages(conn, conversation_id, user_id, messages, mode="append", base_count=None, base_hash=None):
+    """Persist a chat and return {"mode", "count", "last_hash", "inserted", "deleted"}.
+
+    append: with base_count, messages is the tail after that many stored messages (a mismatch
+    raises ChatConflict); without it, messages is the whole chat and only the part beyond what
+    is stored is inserted, or the chat is rewritten if the stored prefix no longer matches
+    (e.g. after an edit). replace: delete and re-insert everything.
+    """
+    if mode not in SAVE_MODES:
+        raise ValueError(f"Unknown save mode '{mode}', expected one of {SAVE_MODES}")
+    rows = [message_fields(m) for m in messages]
+    deleted = 0
+    async with conn.transaction():
+        stored, last_hash = await _stored_state(conn, conversation_id, user_id)
+        kept = stored
+        if mode == "append" and base_count is not None:
+            if base_count != stored or (base_hash and base_hash != last_hash):
+                raise ChatConflict(stored, last_hash)
+            tail = rows
+        elif mode == "append" and len(rows) >= stored and (
+                stored == 0 or message_hash(*rows[stored - 1]) == last_hash):
+            tail = rows[stored:]
+        else:
+            status = await conn.execute("DELETE FROM chat_history WHERE conversation_id = $1 AND user_id = $2",
+                                        conversation_id, user_id)
+            deleted, kept, mode, tail = int(status.split()[-1]), 0, "replace", rows
+        await insert_messages(conn, conversation_id, user_id, tail)
+
+    count = kept + len(tail)
+    # write amplification = (rows_inserted + rows_deleted) / messages_added
+    metrics.incr("chats.saves")
+    metrics.incr("chats.messages_added", max(count - stored, 0))
+    metrics.incr("chats.rows_inserted", len(tail))
+    metrics.incr("chats.rows_deleted", deleted)
+    return {
+        "mode": mode,
+        "count": count,
+        "last_hash": message_hash(*tail[-1]) if tail else (last_hash if count else None),
+        "inserted": len(tail),
+        "deleted": deleted
+    }
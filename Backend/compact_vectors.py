@@ -0,0 +1,50 @@
+"""Add (or drop) a compact copy of doc_chunks.embedding used for first-pass search.
+
+Usage (from Backend/):
+    python compact_vectors.py --mode halfvec|binary [--index hnsw] [--m 16] [--ef-construction 64]
+    python compact_vectors.py --mode binary --drop
+    python compact_vectors.py --report
+
+The copy is a stored generated column (embedding_half halfvec / embedding_bit bit), so
+existing rows are filled by the ALTER TABLE and new uploads need no code change. Then set
+VECTOR_STORAGE to the same mode: the retriever ranks a RESCORE_CANDIDATES shortlist on the
+compact column and rescores it against the full-precision embedding.
+"""
+import argparse
+from db import get_pool
+import vector_index
+
+
+def print_report(conn):
+    report = vector_index.storage_report(conn)
+    print(f"table={report['table_bytes']:,} B  total (with indexes, TOAST)={report['total_bytes']:,} B")
+    for column, size in report["column_bytes"].items():
+        print(f"  column {column:<16} {size:>14,} B")
+    for index, size in report["index_bytes"].items():
+        print(f"  index  {index:<32} {size:>14,} B")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=vector_index.COMPACT_MODES)
+    parser.add_argument("--index", choices=["hnsw"], default=None, help="build an HNSW index on the compact column")
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=64)
+    parser.add_argument("--drop", action="store_true", help="drop the compact column and its index")
+    parser.add_argument("--report", action="store_true", help="only print the storage report")
+    args = parser.parse_args()
+    if not args.report and not args.mode:
+        parser.error("--mode is required unless --report is given")
+
+    with get_pool().connection() as conn:
+        if not args.report:
+            if args.drop:
+                print(vector_index.disable_compact_storage(conn, args.mode))
+            else:
+                print(vector_index.enable_compact_storage(conn, args.mode, index_method=args.index,
+                                                          m=args.m, ef_construction=args.ef_construction))
+        print_report(conn)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import os
+import re
+import threading
+import metrics
+from embeddings import get_embedding_service
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "2000"))
+CONTEXT_HISTORY_TOKEN_BUDGET = int(os.getenv("CONTEXT_HISTORY_TOKEN_BUDGET", "1500"))  # 0 keeps all history
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))  # shingle containment
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "embedder")  # embedder | chars
+
+# chunk overlap left by the splitter (CHUNK_OVERLAP=50) after whitespace normalisation
+_MIN_OVERLAP = 20
+_MAX_OVERLAP = 300
+_SHINGLE = 5
+_CHARS_PER_TOKEN = 4
+
+_WORD = re.compile(r"\w+")
+
+
+class TokenCounter:
+    """Counts tokens with the embedding model's tokenizer, or by characters when it is unavailable."""
+
+    def __init__(self, mode=CONTEXT_TOKENIZER):
+        self.mode = mode
+        self._encode = None
+        self._lock = threading.Lock()
+
+    def _tokenizer(self):
+        if self._encode is None:
+            with self._lock:
+                if self._encode is None:
+                    self._encode = self._load()
+        return self._encode
+
+    def _load(self):
+        encode = self._chars
+        if self.mode == "embedder":
+            try:
+                tokenizer = get_embedding_service().tokenizer
+                fast = getattr(tokenizer, "backend_tokenizer", None)
+                if fast is not None:
+                    # the Rust tokenizer does not warn about inputs longer than the model's max length
+                    encode = lambda text: len(fast.encode(text, add_special_tokens=False).ids)
+                else:
+                    encode = lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+            except Exception as e:
+                print(f"Context tokenizer unavailable, counting characters: {e}")
+        return encode
+
+    def warmup(self):
+        # loading may download tokenizer files (sidecar mode), so do it at startup, not on a request
+        self._tokenizer()
+        return self
+
+    @staticmethod
+    def _chars(text):
+        return (len(text) + _CHARS_PER_TOKEN - 1) // _CHARS_PER_TOKEN
+
+    def __call__(self, text):
+        return self._tokenizer()(text) if text else 0
+
+
+count_tokens = TokenCounter()
+
+
+def _chunk_header(score):
+    return f"\n\n--- Retrieved Chunk (score={score:.3f}) ---\n"
+
+
+def _join_overlapping(left, right):
+    """Concatenate two consecutive chunks, dropping the text the splitter repeated at the seam."""
+    for k in range(min(len(left), len(right), _MAX_OVERLAP), _MIN_OVERLAP - 1, -1):
+        if left.endswith(right[:k]):
+            return left + right[k:]
+    return left + "\n" + right
+
+
+def _shingles(text):
+    words = _WORD.findall(text.lower())
+    return {tuple(words[i:i + _SHINGLE]) for i in range(max(len(words) - _SHINGLE + 1, 1))}
+
+
+def _priority(hit):
+    """Lower is better: the cross-encoder score when the hits were reranked, else the vector distance."""
+    return -hit["rerank_score"] if "rerank_score" in hit else hit["score"]
+
+
+class _Block:
+    def __init__(self, hit):
+        self.doc_name = hit["doc_name"]
+        self.first = self.last = hit["chunk_id"]
+        self.text = hit["text"]
+        self.score = hit["score"]
+        self.priority = _priority(hit)
+        self.members = 1
+
+
+def merge_adjacent(hits):
+    """Merge hits that are consecutive chunks of the same document into one block."""
+    blocks = []
+    ordered = sorted(hits, key=lambda h: (h["doc_name"], h["chunk_id"]))
+    for hit in ordered:
+        last = blocks[-1] if blocks else None
+        if last is not None and last.doc_name == hit["doc_name"] and hit["chunk_id"] == last.last + 1:
+            last.text = _join_overlapping(last.text, hit["text"])
+            last.last = hit["chunk_id"]
+            last.score = min(last.score, hit["score"])
+            last.priority = min(last.priority, _priority(hit))
+            last.members += 1
+        elif last is not None and last.doc_name == hit["doc_name"] and hit["chunk_id"] == last.last:
+            continue  # same chunk returned twice
+        else:
+            blocks.append(_Block(hit))
+    return blocks
+
+
+def assemble_context(hits, budget=CONTEXT_TOKEN_BUDGET):
+    """Build the prompt context from retrieval hits within a token budget.
+
+    Returns (context, selected blocks, report); the report compares against plain
+    concatenation of every hit.
+    """
+    baseline = sum(count_tokens(_chunk_header(h["score"]) + h["text"]) for h in hits)
+    blocks = sorted(merge_adjacent(hits), key=lambda b: b.priority)
+
+    selected, seen, used = [], [], 0
+    deduped = over_budget = 0
+    for block in blocks:
+        shingles = _shingles(block.text)
+        if any(len(shingles & other) >= CONTEXT_DEDUP_THRESHOLD * len(shingles) for other in seen):
+            deduped += 1
+            continue
+        tokens = count_tokens(_chunk_header(block.score) + block.text)
+        if used + tokens > budget and selected:
+            over_budget += 1
+            continue
+        selected.append(block)
+        seen.append(shingles)
+        used += tokens
+
+    context = "".join(_chunk_header(b.score) + b.text for b in selected)
+    report = {
+        "chunks_in": len(hits),
+        "blocks_out": len(selected),
+        "merged": len(hits) - len(blocks),
+        "deduplicated": deduped,
+        "over_budget": over_budget,
+        "tokens_budget": budget,
+        "tokens_baseline": baseline,
+        "tokens_used": used,
+        "tokens_saved": max(baseline - used, 0)
+    }
+    metrics.incr("context.tokens_saved", report["tokens_saved"])
+    metrics.incr("context.tokens_used", used)
+    return context, selected, report
+
+
+def trim_history(history, budget=CONTEXT_HISTORY_TOKEN_BUDGET):
+    """Keep the most recent messages that fit in budget tokens; returns (messages, tokens saved)."""
+    if budget <= 0 or not history:
+        return list(history), 0
+    kept, used = [], 0
+    for msg in reversed(history):
+        tokens = count_tokens(msg["content"])
+        if kept and used + tokens > budget:
+            break
+        kept.append(msg)
+        used += tokens
+    saved = sum(count_tokens(msg["content"]) for msg in history[:len(history) - len(kept)])
+    metrics.incr("context.history_tokens_saved", saved)
+    return list(reversed(kept)), saved
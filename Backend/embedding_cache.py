@@ -0,0 +1,200 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+EMBED_CACHE_MEMORY_ENTRIES = int(os.getenv("EMBED_CACHE_MEMORY_ENTRIES", "10000"))
+EMBED_CACHE_DISK_ENTRIES = int(os.getenv("EMBED_CACHE_DISK_ENTRIES", "500000"))
+EMBED_CACHE_DTYPE = os.getenv("EMBED_CACHE_DTYPE", "float32")  # float32 | float16
+EMBED_CACHE_PATH = os.getenv(
+    "EMBED_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "embeddings.sqlite3")
+)
+
+_SQLITE_BATCH = 500
+_EVICT_CHECK_EVERY = 1000
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache: an in-process LRU in front of an on-disk SQLite store.
+
+    Entries are keyed by (model name, prefix, sha256 of the text) and both tiers are size-bounded.
+    The SQLite connection is opened lazily per process: one inherited across fork (gunicorn
+    preload) must not be used by the child, so a new one is opened when the PID changes.
+    """
+
+    def __init__(self, path=EMBED_CACHE_PATH, memory_entries=EMBED_CACHE_MEMORY_ENTRIES,
+                 disk_entries=EMBED_CACHE_DISK_ENTRIES, dtype=EMBED_CACHE_DTYPE):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.disk_entries = disk_entries
+        self.dtype = np.dtype(dtype)
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+        self._inherited = []
+        self._writes_since_evict = 0
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "memory_evictions": 0, "disk_evictions": 0}
+
+    def _disk(self):
+        """This process's SQLite connection or None; callers hold _lock."""
+        if not self.path:
+            return None
+        pid = os.getpid()
+        if self._db_pid != pid:
+            if self._db is not None:
+                # the parent's connection: neither use nor close it here, just keep it referenced
+                self._inherited.append(self._db)
+            self._db = self._open_disk()
+            self._db_pid = pid
+        return self._db
+
+    def _open_disk(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    prefix TEXT NOT NULL,
+                    text_hash TEXT NOT NULL,
+                    dtype TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL,
+                    PRIMARY KEY (model, prefix, text_hash)
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used_idx ON embeddings (last_used)")
+            db.commit()
+            return db
+        except sqlite3.Error as e:
+            print(f"Embedding disk cache disabled ({self.path}): {e}")
+            return None
+
+    def _remember(self, key, vector):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self.counters["memory_evictions"] += 1
+
+    def get_many(self, model, prefix, texts):
+        """Return a list aligned with texts holding cached float32 vectors or None."""
+        hashes = [text_hash(t) for t in texts]
+        results = [None] * len(texts)
+        disk_lookup = {}
+        with self._lock:
+            for i, h in enumerate(hashes):
+                vector = self._memory.get((model, prefix, h))
+                if vector is not None:
+                    self._memory.move_to_end((model, prefix, h))
+                    results[i] = vector
+                    self.counters["memory_hits"] += 1
+                else:
+                    disk_lookup.setdefault(h, []).append(i)
+
+            if disk_lookup and self._disk() is not None:
+                found = self._disk_get(model, prefix, list(disk_lookup))
+                for h, vector in found.items():
+                    self._remember((model, prefix, h), vector)
+                    for i in disk_lookup.pop(h):
+                        results[i] = vector
+                        self.counters["disk_hits"] += 1
+
+            self.counters["misses"] += sum(len(v) for v in disk_lookup.values())
+        return [None if r is None else r.astype(np.float32) for r in results]
+
+    def _disk_get(self, model, prefix, hashes):
+        found = {}
+        try:
+            for offset in range(0, len(hashes), _SQLITE_BATCH):
+                batch = hashes[offset:offset + _SQLITE_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self._db.execute(
+                    f"SELECT text_hash, dtype, vector FROM embeddings WHERE model = ? AND prefix = ? AND text_hash IN ({marks})",
+                    [model, prefix] + batch
+                ).fetchall()
+                for h, dtype, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=dtype)
+            if found:
+                now = time.time()
+                self._db.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND prefix = ? AND text_hash = ?",
+                    [(now, model, prefix, h) for h in found]
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Embedding disk cache read failed: {e}")
+        return found
+
+    def put_many(self, model, prefix, texts, vectors):
+        entries = [(text_hash(t), np.ascontiguousarray(v, dtype=self.dtype)) for t, v in zip(texts, vectors)]
+        with self._lock:
+            for h, vector in entries:
+                self._remember((model, prefix, h), vector)
+            if self._disk() is None:
+                return
+            try:
+                now = time.time()
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, prefix, text_hash, dtype, vector, last_used) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(model, prefix, h, self.dtype.name, v.tobytes(), now) for h, v in entries]
+                )
+                self._db.commit()
+                self._writes_since_evict += len(entries)
+                if self._writes_since_evict >= _EVICT_CHECK_EVERY:
+                    self._evict_disk()
+            except sqlite3.Error as e:
+                print(f"Embedding disk cache write failed: {e}")
+
+    def _evict_disk(self):
+        self._writes_since_evict = 0
+        (count,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        excess = count - self.disk_entries
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,)
+            )
+            self._db.commit()
+            self.counters["disk_evictions"] += excess
+
+    def stats(self):
+        with self._lock:
+            lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            hits = lookups - self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_rate": round(hits / lookups, 4) if lookups else None,
+                "memory_entries": len(self._memory),
+                "memory_capacity": self.memory_entries,
+                "disk_path": self.path if self._db is not None else None,
+                "disk_capacity": self.disk_entries,
+                "dtype": self.dtype.name
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache():
+    global _cache
+    if not EMBED_CACHE_ENABLED:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
@@ -0,0 +1,105 @@
+"""Embedding sidecar: one process owns the model and serves every API worker over a Unix socket.
+
+Usage (from Backend/):
+    python embedding_server.py [--socket /tmp/sap-trm-embed.sock]
+
+Then start the API workers with EMBED_SOCKET set to the same path; get_embedding_service()
+returns a RemoteEmbeddingService that sends texts here instead of loading the model. The
+model is loaded before the socket is bound, so a connectable socket means the sidecar is
+ready. gunicorn.conf.py starts and stops it automatically when EMBED_SOCKET is set. The
+embedding cache lives here too, shared by all workers.
+
+Frames are a 4-byte big-endian length followed by a JSON header, then a 4-byte length and a
+binary payload (float32 vectors, row-major) that may be empty.
+"""
+import argparse
+import json
+import os
+import signal
+import socketserver
+import struct
+import sys
+import numpy as np
+
+_LENGTH = struct.Struct(">I")
+
+
+def _read_exact(sock, n):
+    chunks = []
+    while n:
+        chunk = sock.recv(min(n, 1 << 20))
+        if not chunk:
+            raise ConnectionError("embedding socket closed")
+        chunks.append(chunk)
+        n -= len(chunk)
+    return b"".join(chunks)
+
+
+def send_frame(sock, header, payload=b""):
+    body = json.dumps(header).encode("utf-8")
+    sock.sendall(_LENGTH.pack(len(body)) + body + _LENGTH.pack(len(payload)) + payload)
+
+
+def recv_frame(sock):
+    header = json.loads(_read_exact(sock, _LENGTH.unpack(_read_exact(sock, _LENGTH.size))[0]))
+    payload = _read_exact(sock, _LENGTH.unpack(_read_exact(sock, _LENGTH.size))[0])
+    return header, payload
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        service = self.server.service
+        while True:
+            try:
+                request, _ = recv_frame(self.request)
+            except ConnectionError:
+                return
+            try:
+                if request["op"] == "info":
+                    send_frame(self.request, {
+                        "model_name": service.model_name, "backend": service.backend, "dtype": service.dtype,
+                        "dimension": service.dimension, "cache_namespace": service.cache_namespace,
+                        "batch_size": service.batch_size, "pid": os.getpid()
+                    })
+                elif request["op"] == "encode":
+                    encode = service.encode_queries if request["kind"] == "query" else service.encode_documents
+                    vectors = np.ascontiguousarray(encode(request["texts"], request.get("batch_size")), dtype=np.float32)
+                    send_frame(self.request, {"shape": list(vectors.shape)}, vectors.tobytes())
+                else:
+                    send_frame(self.request, {"error": f"unknown op {request['op']!r}"})
+            except Exception as e:
+                send_frame(self.request, {"error": str(e)})
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, service):
+        self.service = service
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _Handler)
+
+
+def main():
+    from embeddings import EmbeddingService, EMBED_SOCKET
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", default=EMBED_SOCKET or "/tmp/sap-trm-embed.sock")
+    args = parser.parse_args()
+
+    # the service must load the model itself, not connect to the socket it is about to serve
+    service = EmbeddingService().warmup()
+    server = EmbeddingServer(args.socket, service)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"Embedding sidecar ready on {args.socket} ({service.model_name}, {service.dimension} dims)")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
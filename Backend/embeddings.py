@@ -0,0 +1,295 @@
+import os
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from embedding_cache import get_embedding_cache
+
+load_dotenv()
+
+EMBED_MODEL_NAME = os.getenv("EMBED_MODEL_NAME", "BAAI/bge-large-en-v1.5")
+EMBED_DEVICE = os.getenv("EMBED_DEVICE") or None
+EMBED_DTYPE = os.getenv("EMBED_DTYPE", "float32")
+EMBED_NUM_THREADS = int(os.getenv("EMBED_NUM_THREADS", "0"))
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+EMBED_BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+EMBED_ONNX_FILE = os.getenv("EMBED_ONNX_FILE") or None  # pre-exported file inside the model repo, e.g. onnx/model_qint8_avx2.onnx
+EMBED_ONNX_QUANTIZATION = os.getenv("EMBED_ONNX_QUANTIZATION", "avx2")  # avx2 | avx512 | avx512_vnni | arm64
+EMBED_EXPORT_DIR = os.getenv(
+    "EMBED_EXPORT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "models")
+)
+
+# Unix socket of embedding_server.py; when set, workers call the sidecar instead of loading the model
+EMBED_SOCKET = os.getenv("EMBED_SOCKET") or None
+EMBED_SOCKET_TIMEOUT = float(os.getenv("EMBED_SOCKET_TIMEOUT", "60"))
+# load the model in the worker while the sidecar is unreachable instead of failing requests
+EMBED_SOCKET_FALLBACK = os.getenv("EMBED_SOCKET_FALLBACK", "true").lower() in ("1", "true", "yes")
+
+QUERY_PREFIX = "Represent this query: "
+DOCUMENT_PREFIX = "Represent this document: "
+
+
+class EmbeddingService:
+    """Owns the sentence-transformer model; loaded once on first use and shared by retrieval and ingestion."""
+
+    def __init__(self, model_name=EMBED_MODEL_NAME, device=EMBED_DEVICE, dtype=EMBED_DTYPE,
+                 num_threads=EMBED_NUM_THREADS, batch_size=EMBED_BATCH_SIZE, cache=None, backend=EMBED_BACKEND):
+        if backend not in EMBED_BACKENDS:
+            raise ValueError(f"Unknown embedding backend '{backend}', expected one of {EMBED_BACKENDS}")
+        self.model_name = model_name
+        self.backend = backend
+        self.device = device
+        self.dtype = dtype
+        self.num_threads = num_threads
+        self.batch_size = batch_size
+        self.cache = cache if cache is not None else get_embedding_cache()
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._load()
+        return self._model
+
+    def _load(self):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if self.num_threads > 0:
+            torch.set_num_threads(self.num_threads)
+
+        print(f"Loading embedding model: {self.model_name} (backend={self.backend}, "
+              f"device={self.device or 'auto'}, dtype={self.dtype})...")
+        if self.backend == "onnx":
+            model_kwargs = {"file_name": EMBED_ONNX_FILE} if EMBED_ONNX_FILE else {}
+            return SentenceTransformer(self.model_name, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+        if self.backend == "onnx-int8":
+            return self._load_onnx_int8()
+
+        model = SentenceTransformer(self.model_name, device=self.device)
+        if self.backend == "torch-int8":
+            # dynamic int8 quantization of the Linear layers; CPU only
+            model = torch.quantization.quantize_dynamic(model.to("cpu"), {torch.nn.Linear}, dtype=torch.qint8)
+        elif self.dtype != "float32":
+            model = model.to(getattr(torch, self.dtype))
+        model.eval()
+        return model
+
+    def _load_onnx_int8(self):
+        from sentence_transformers import SentenceTransformer
+
+        if EMBED_ONNX_FILE:
+            return SentenceTransformer(self.model_name, device="cpu", backend="onnx",
+                                       model_kwargs={"file_name": EMBED_ONNX_FILE})
+
+        # quantize our own export once and reuse it from EMBED_EXPORT_DIR
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+        local_dir = os.path.join(EMBED_EXPORT_DIR, self.model_name.replace("/", "__"))
+        file_name = f"onnx/model_qint8_{EMBED_ONNX_QUANTIZATION}.onnx"
+        if not os.path.exists(os.path.join(local_dir, file_name)):
+            print(f"Exporting int8 ONNX model to {local_dir}...")
+            model = SentenceTransformer(self.model_name, device="cpu", backend="onnx")
+            model.save(local_dir)
+            export_dynamic_quantized_onnx_model(model, EMBED_ONNX_QUANTIZATION, local_dir)
+        return SentenceTransformer(local_dir, device="cpu", backend="onnx", model_kwargs={"file_name": file_name})
+
+    def warmup(self):
+        self.model
+        return self
+
+    @property
+    def cache_namespace(self):
+        # vectors from different backends are close but not identical, so they are cached apart
+        namespace = f"{self.model_name}@{self.dtype}"
+        return namespace if self.backend == "torch" else f"{namespace}+{self.backend}"
+
+    @property
+    def dimension(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    @property
+    def tokenizer(self):
+        return self.model.tokenizer
+
+    def _encode_uncached(self, texts, prefix, batch_size=None):
+        return self.model.encode(
+            [f"{prefix}{t}" for t in texts],
+            batch_size=batch_size or self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        ).astype("float32", copy=False)
+
+    def _encode(self, texts, prefix, batch_size=None):
+        texts = list(texts)
+        if self.cache is None:
+            return self._encode_uncached(texts, prefix, batch_size)
+
+        vectors = self.cache.get_many(self.cache_namespace, prefix, texts)
+        missing = {}
+        for i, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(texts[i], []).append(i)
+        if missing:
+            unique = list(missing)
+            fresh = self._encode_uncached(unique, prefix, batch_size)
+            self.cache.put_many(self.cache_namespace, prefix, unique, fresh)
+            for text, vector in zip(unique, fresh):
+                for i in missing[text]:
+                    vectors[i] = vector
+        if not vectors:
+            return np.empty((0, self.dimension), dtype="float32")
+        return np.vstack(vectors)
+
+    def encode_queries(self, queries, batch_size=None):
+        return self._encode(queries, QUERY_PREFIX, batch_size)
+
+    def encode_documents(self, texts, batch_size=None):
+        return self._encode(texts, DOCUMENT_PREFIX, batch_size)
+
+
+class RemoteEmbeddingService:
+    """EmbeddingService interface backed by the embedding_server.py sidecar; one socket per thread.
+
+    While the sidecar is down (crashed, OOM-killed, restarting) calls go to a local
+    EmbeddingService loaded on first need, and back to the sidecar once it accepts again.
+    """
+
+    def __init__(self, socket_path=EMBED_SOCKET, timeout=EMBED_SOCKET_TIMEOUT, fallback=EMBED_SOCKET_FALLBACK):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.fallback = fallback
+        self.cache = None  # the sidecar caches, shared by every worker
+        self._local = threading.local()
+        self._info = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+        self._local_service = None
+
+    def _connect(self):
+        import socket
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+    def _call(self, request, retry=True):
+        from embedding_server import send_frame, recv_frame
+
+        sock = getattr(self._local, "sock", None)
+        try:
+            if sock is None:
+                sock = self._local.sock = self._connect()
+            send_frame(sock, request)
+            header, payload = recv_frame(sock)
+        except (OSError, ConnectionError):
+            if sock is not None:
+                sock.close()
+            self._local.sock = None
+            if retry:  # the sidecar may have restarted since this thread last connected
+                return self._call(request, retry=False)
+            raise
+        if "error" in header:
+            raise RuntimeError(f"Embedding sidecar error: {header['error']}")
+        return header, payload
+
+    def _fallback(self, error):
+        if not self.fallback:
+            raise error
+        if self._local_service is None:
+            with self._lock:
+                if self._local_service is None:
+                    print(f"DEBUG: Embedding sidecar at {self.socket_path} unreachable ({error}); "
+                          f"embedding in this worker until it is back")
+                    self._local_service = EmbeddingService()
+        return self._local_service
+
+    @property
+    def info(self):
+        if self._info is None:
+            try:
+                self._info = self._call({"op": "info"})[0]
+            except OSError as e:
+                local = self._fallback(e)
+                return {"model_name": local.model_name, "backend": local.backend, "dtype": local.dtype,
+                        "batch_size": local.batch_size, "cache_namespace": local.cache_namespace,
+                        "dimension": local.dimension}
+        return self._info
+
+    @property
+    def model_name(self):
+        return self.info["model_name"]
+
+    @property
+    def backend(self):
+        return self.info["backend"]
+
+    @property
+    def dtype(self):
+        return self.info["dtype"]
+
+    @property
+    def batch_size(self):
+        return self.info["batch_size"]
+
+    @property
+    def cache_namespace(self):
+        return self.info["cache_namespace"]
+
+    @property
+    def dimension(self):
+        return self.info["dimension"]
+
+    @property
+    def model(self):
+        # the sidecar's weights are not reachable from here; this loads a local copy
+        return self._fallback(RuntimeError(f"The embedding model runs in the sidecar at {self.socket_path}")).model
+
+    @property
+    def tokenizer(self):
+        # tokenizer files only, for counting context tokens; the weights stay in the sidecar
+        if self._tokenizer is None:
+            with self._lock:
+                if self._tokenizer is None:
+                    from transformers import AutoTokenizer
+                    self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        return self._tokenizer
+
+    def warmup(self):
+        self.info
+        return self
+
+    def _encode(self, texts, kind, batch_size=None):
+        texts = list(texts)
+        if not texts:
+            return np.empty((0, self.dimension), dtype="float32")
+        try:
+            header, payload = self._call({"op": "encode", "kind": kind, "texts": texts, "batch_size": batch_size})
+        except OSError as e:
+            local = self._fallback(e)
+            encode = local.encode_queries if kind == "query" else local.encode_documents
+            return encode(texts, batch_size)
+        return np.frombuffer(payload, dtype=np.float32).reshape(header["shape"])
+
+    def encode_queries(self, queries, batch_size=None):
+        return self._encode(queries, "query", batch_size)
+
+    def encode_documents(self, texts, batch_size=None):
+        return self._encode(texts, "document", batch_size)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service():
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = RemoteEmbeddingService() if EMBED_SOCKET else EmbeddingService()
+    return _service
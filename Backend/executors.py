@@ -0,0 +1,40 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Dedicated pools for blocking work called from async handlers, sized explicitly instead of
+# sharing the default threadpool: model inference (embedding, retrieval, rerank) and bcrypt.
+EXECUTOR_SIZES = {
+    "embed": int(os.getenv("EMBED_EXECUTOR_WORKERS", "4")),
+    "bcrypt": int(os.getenv("BCRYPT_EXECUTOR_WORKERS", "2")),
+}
+
+_executors = {}
+_lock = threading.Lock()
+
+
+def get_executor(name):
+    executor = _executors.get(name)
+    if executor is None:
+        with _lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = _executors[name] = ThreadPoolExecutor(max_workers=EXECUTOR_SIZES[name],
+                                                                 thread_name_prefix=f"{name}-executor")
+    return executor
+
+
+async def run_in(name, fn, *args, **kwargs):
+    """Await fn(*args, **kwargs) on the named executor."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(name), functools.partial(fn, *args, **kwargs))
+
+
+def shutdown():
+    with _lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=False, cancel_futures=True)
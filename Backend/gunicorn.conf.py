@@ -0,0 +1,119 @@
+"""Multi-worker deployment: gunicorn managing uvicorn workers.
+
+Run from Backend/:  gunicorn -c gunicorn.conf.py api:app
+
+Three ways to hold the embedding model across WEB_CONCURRENCY workers:
+  - default: the app is preloaded in the master (imports only) and every worker loads its
+    own copy of the weights in the background warm-up behind /ready, after it has started
+    accepting connections. GUNICORN_WARM_WORKERS=true loads them before the worker accepts
+    anything instead (used by benchmarks.workers).
+  - GUNICORN_PRELOAD_MODEL=true: the master also loads the weights before forking, so the
+    workers share those pages copy-on-write. The master never runs inference, so no torch
+    or OpenMP thread pool exists yet at fork time.
+  - EMBED_SOCKET=/path.sock (opt-in): one embedding_server.py sidecar, started and supervised
+    here, owns the model and the embedding cache; workers call it over the Unix socket and load
+    no weights. If it dies it is restarted, and workers embed locally until it is back
+    (embeddings.EMBED_SOCKET_FALLBACK).
+
+State that must agree across workers lives in Postgres: ingestion jobs and their limits
+(jobs.JobStore, advisory-lock run slots), answer-cache invalidations (NOTIFY on the
+answer_cache channel) and the memory index manifest (file lock). Other caches are per worker.
+"""
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+
+PRELOAD_MODEL = os.getenv("GUNICORN_PRELOAD_MODEL", "false").lower() in ("1", "true", "yes")
+WARM_WORKERS = os.getenv("GUNICORN_WARM_WORKERS", "false").lower() in ("1", "true", "yes")
+EMBED_SOCKET = os.getenv("EMBED_SOCKET") or None
+SIDECAR_AUTOSTART = os.getenv("EMBED_SIDECAR_AUTOSTART", "true").lower() in ("1", "true", "yes")
+SIDECAR_START_TIMEOUT = float(os.getenv("EMBED_SIDECAR_START_TIMEOUT", "600"))
+SIDECAR_CHECK_INTERVAL = float(os.getenv("EMBED_SIDECAR_CHECK_INTERVAL", "5"))
+SIDECAR_MAX_BACKOFF = 300
+
+_sidecar = None
+_stopping = threading.Event()
+
+
+def _sidecar_ready(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def _start_sidecar():
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    return subprocess.Popen([sys.executable, os.path.join(backend_dir, "embedding_server.py"),
+                             "--socket", EMBED_SOCKET], cwd=backend_dir)
+
+
+def _supervise_sidecar(server):
+    # master thread: restart the sidecar when it exits, backing off while it keeps crashing on start
+    global _sidecar
+    backoff = SIDECAR_CHECK_INTERVAL
+    started = time.monotonic()
+    while not _stopping.wait(SIDECAR_CHECK_INTERVAL):
+        if _sidecar.poll() is None:
+            continue
+        crashed_early = time.monotonic() - started < 60
+        backoff = min(backoff * 2, SIDECAR_MAX_BACKOFF) if crashed_early else SIDECAR_CHECK_INTERVAL
+        server.log.warning("Embedding sidecar %s exited with %s; restarting in %.0fs",
+                           _sidecar.pid, _sidecar.returncode, backoff)
+        if _stopping.wait(backoff):
+            return
+        _sidecar = _start_sidecar()
+        started = time.monotonic()
+
+
+def on_starting(server):
+    # runs in the master before any worker is forked; workers connect to the socket lazily
+    global _sidecar
+    if not (EMBED_SOCKET and SIDECAR_AUTOSTART):
+        return
+    _sidecar = _start_sidecar()
+    deadline = time.monotonic() + SIDECAR_START_TIMEOUT
+    while not _sidecar_ready(EMBED_SOCKET):
+        if _sidecar.poll() is not None:
+            raise RuntimeError(f"Embedding sidecar exited with {_sidecar.returncode}")
+        if time.monotonic() > deadline:
+            _sidecar.terminate()
+            raise RuntimeError(f"Embedding sidecar did not start within {SIDECAR_START_TIMEOUT:.0f}s")
+        time.sleep(0.5)
+    server.log.info("Embedding sidecar %s ready on %s", _sidecar.pid, EMBED_SOCKET)
+    threading.Thread(target=_supervise_sidecar, args=(server,), name="sidecar-supervisor", daemon=True).start()
+
+
+def when_ready(server):
+    # still in the master, just before the first fork
+    if PRELOAD_MODEL and not EMBED_SOCKET:
+        from embeddings import get_embedding_service
+        get_embedding_service().warmup()
+        server.log.info("Embedding model loaded in the master; workers share it copy-on-write")
+
+
+def post_worker_init(worker):
+    if WARM_WORKERS:
+        from embeddings import get_embedding_service
+        get_embedding_service().warmup()
+
+
+def on_exit(server):
+    _stopping.set()
+    if _sidecar is not None and _sidecar.poll() is None:
+        _sidecar.terminate()
+        _sidecar.wait(timeout=30)
@@ -0,0 +1,296 @@
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+import numpy as np
+import metrics
+from embeddings import get_embedding_service
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, run a single process there
+    fcntl = None
+
+INTENT_LOCAL_ENABLED = os.getenv("INTENT_LOCAL_ENABLED", "true").lower() in ("1", "true", "yes")
+INTENT_LOCAL_THRESHOLD = float(os.getenv("INTENT_LOCAL_THRESHOLD", "0.85"))  # probability of the predicted class
+INTENT_CACHE_SIZE = int(os.getenv("INTENT_CACHE_SIZE", "2048"))
+INTENT_RETRAIN_EVERY = int(os.getenv("INTENT_RETRAIN_EVERY", "200"))  # new LLM verdicts between retrains
+_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+# The verdict log stores raw user queries (user text) as training data; it is trimmed to the
+# latest INTENT_LOG_MAX_ROWS rows on every retrain. INTENT_LOG_PATH= disables it.
+INTENT_LOG_PATH = os.getenv("INTENT_LOG_PATH", os.path.join(_CACHE_DIR, "intent_verdicts.jsonl"))
+INTENT_LOG_MAX_ROWS = int(os.getenv("INTENT_LOG_MAX_ROWS", "5000"))
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", os.path.join(_CACHE_DIR, "intent_model.npz"))
+
+RUNBOOK = "RUNBOOK_REQUEST"
+GENERAL = "GENERAL_QUERY"
+
+# (query, intent, topic) - these are the examples shown to the LLM classifier
+INTENT_EXAMPLES = [
+    ("How do I settle a deal?", RUNBOOK, "Deal Settlement"),
+    ("What are the steps for month end?", RUNBOOK, "Month-End Procedures"),
+    ("Troubleshoot OT84 errors", RUNBOOK, "OT84 Troubleshooting"),
+    ("Configure product types", RUNBOOK, "Product Type Setup"),
+    ("What is Portfolio Analyzer?", GENERAL, None),
+    ("Explain FX risk", GENERAL, None),
+    ("What is a business partner?", GENERAL, None),
+    ("Explain it in short", GENERAL, None),
+    ("List the types of treasury instruments", GENERAL, None),
+]
+
+# Extra phrasings so the local model is useful before any traffic has been logged
+SEED_EXAMPLES = [
+    ("How do I post a fixed-term deposit in TM_52?", RUNBOOK, "Fixed-Term Deposit Posting"),
+    ("Steps to reverse a settled FX deal", RUNBOOK, "FX Deal Reversal"),
+    ("How can I run the valuation for period end?", RUNBOOK, "Period-End Valuation"),
+    ("Walk me through setting up a new counterparty", RUNBOOK, "Counterparty Setup"),
+    ("Procedure to fix a failed payment run", RUNBOOK, "Payment Run Troubleshooting"),
+    ("How to configure the position management procedure", RUNBOOK, "Position Management Setup"),
+    ("What should I do when TPM1 fails?", RUNBOOK, "TPM1 Troubleshooting"),
+    ("Guide me through the accrual/deferral run", RUNBOOK, "Accrual Deferral Run"),
+    ("How do I restore the system from backup?", RUNBOOK, "Backup Recovery"),
+    ("Give me the checklist for deploying a transport", RUNBOOK, "Transport Deployment"),
+    ("What is a money market transaction?", GENERAL, None),
+    ("Define hedge accounting", GENERAL, None),
+    ("What does TBB1 do?", GENERAL, None),
+    ("Why is counterparty risk important?", GENERAL, None),
+    ("Difference between spot and forward FX", GENERAL, None),
+    ("Tell me more about that", GENERAL, None),
+    ("What is the market risk analyzer?", GENERAL, None),
+    ("Summarize the treasury module", GENERAL, None),
+    ("Which instruments are supported in SAP TRM?", GENERAL, None),
+    ("Can you explain the previous answer more simply?", GENERAL, None),
+]
+
+_TOPIC_PREFIX = re.compile(
+    r"^(how (do|can|should) (i|we|you)|how to|what are the steps (for|to)|steps (for|to)|procedure (for|to)|"
+    r"walk me through|guide me through|give me the checklist for|troubleshoot(ing)?|configure|set ?up)\s+",
+    re.IGNORECASE
+)
+
+
+@contextmanager
+def _file_lock(path, blocking=True):
+    """Exclusive lock on path across processes; yields False if blocking=False and it is held elsewhere."""
+    if fcntl is None:
+        yield True
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def normalize(query):
+    return " ".join(query.lower().split())
+
+
+def guess_topic(query):
+    """Short topic for a procedural query when no LLM is asked to name one."""
+    text = _TOPIC_PREFIX.sub("", query.strip().rstrip("?.!"))
+    words = [w for w in text.split() if w.lower() not in ("a", "an", "the", "my", "our", "in", "for", "of", "to", "on", "with")][:4]
+    return " ".join(w if w.isupper() else w.capitalize() for w in words) or "this topic"
+
+
+class IntentClassifier:
+    """Logistic regression over query embeddings, with an LRU of recent verdicts.
+
+    Trained from INTENT_EXAMPLES, SEED_EXAMPLES and LLM verdicts logged by record(); the
+    fitted weights are kept on disk so it starts and runs without network access. Several
+    processes may share the files: appends and trims of the log take a file lock, and a
+    retrain is skipped while another process holds the training lock.
+    """
+
+    def __init__(self, embedder=None, threshold=INTENT_LOCAL_THRESHOLD, cache_size=INTENT_CACHE_SIZE,
+                 log_path=INTENT_LOG_PATH, model_path=INTENT_MODEL_PATH, log_max_rows=INTENT_LOG_MAX_ROWS):
+        self.embedder = embedder or get_embedding_service()
+        self.threshold = threshold
+        self.cache_size = cache_size
+        self.log_path = log_path
+        self.model_path = model_path
+        self.log_max_rows = log_max_rows
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._train_lock = threading.RLock()
+        self._weights = None
+        self._bias = 0.0
+        self._logged_since_train = 0
+
+    def _trim_log(self):
+        """Keep only the latest log_max_rows verdicts; returns them."""
+        if not self.log_path or not os.path.exists(self.log_path):
+            return []
+        with self._log_lock, _file_lock(self.log_path + ".lock"):
+            with open(self.log_path, "r", encoding="utf-8") as f:
+                total = 0
+                lines = deque(maxlen=self.log_max_rows)
+                for line in f:
+                    total += 1
+                    lines.append(line)
+            if total > len(lines):
+                with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=os.path.dirname(self.log_path),
+                                                 suffix=".tmp", delete=False) as tmp:
+                    tmp.writelines(lines)
+                os.replace(tmp.name, self.log_path)
+        return list(lines)
+
+    def training_examples(self):
+        examples = [(q, intent) for q, intent, _ in INTENT_EXAMPLES + SEED_EXAMPLES]
+        for line in self._trim_log():
+            try:
+                row = json.loads(line)
+                examples.append((row["query"], row["intent"]))
+            except (ValueError, KeyError):
+                continue
+        # the latest verdict wins for repeated queries
+        return list({normalize(q): (q, intent) for q, intent in examples}.values())
+
+    def train(self, epochs=300, lr=0.5, l2=1e-3, blocking=True):
+        """Fit and save the model; returns the number of examples, or None if another process is training."""
+        with self._train_lock:
+            if not self.model_path:
+                return self._train(epochs, lr, l2)
+            with _file_lock(self.model_path + ".lock", blocking) as locked:
+                if not locked:
+                    return None
+                return self._train(epochs, lr, l2)
+
+    def _train(self, epochs, lr, l2):
+        examples = self.training_examples()
+        x = np.asarray(self.embedder.encode_queries([q for q, _ in examples]), dtype=np.float32)
+        y = np.asarray([intent == RUNBOOK for _, intent in examples], dtype=np.float32)
+        # balance the classes so a skewed traffic log does not bias the decision boundary
+        positives = max(y.sum(), 1.0)
+        negatives = max(len(y) - y.sum(), 1.0)
+        sample_weight = np.where(y == 1, len(y) / (2 * positives), len(y) / (2 * negatives)).astype(np.float32)
+
+        w = np.zeros(x.shape[1], dtype=np.float32)
+        b = 0.0
+        for _ in range(epochs):
+            p = 1.0 / (1.0 + np.exp(-(x @ w + b)))
+            err = (p - y) * sample_weight
+            w -= lr * (x.T @ err / len(y) + l2 * w)
+            b -= lr * float(err.mean())
+
+        with self._lock:
+            self._weights, self._bias = w, b
+            self._cache.clear()
+        self._logged_since_train = 0
+        self._save(len(examples))
+        metrics.incr("intent.local_trainings")
+        return len(examples)
+
+    def _save(self, n_examples):
+        if not self.model_path:
+            return
+        os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(self.model_path), suffix=".tmp.npz", delete=False) as tmp:
+            np.savez(tmp, weights=self._weights, bias=self._bias,
+                     namespace=self.embedder.cache_namespace, examples=n_examples)
+        try:
+            os.replace(tmp.name, self.model_path)
+        except OSError:
+            os.unlink(tmp.name)
+            raise
+
+    def _load(self):
+        if not self.model_path or not os.path.exists(self.model_path):
+            return False
+        try:
+            data = np.load(self.model_path)
+            if str(data["namespace"]) != self.embedder.cache_namespace:
+                return False
+            self._weights, self._bias = data["weights"], float(data["bias"])
+            return True
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def _ensure_model(self):
+        if self._weights is None:
+            with self._train_lock:
+                if self._weights is None and not self._load():
+                    self.train()
+
+    def probability(self, query):
+        """P(RUNBOOK_REQUEST) according to the local model."""
+        self._ensure_model()
+        x = self.embedder.encode_queries([query])[0]
+        with self._lock:
+            w, b = self._weights, self._bias
+        return float(1.0 / (1.0 + np.exp(-(float(x @ w) + b))))
+
+    def _cached(self, key):
+        with self._lock:
+            verdict = self._cache.get(key)
+            if verdict is not None:
+                self._cache.move_to_end(key)
+            return verdict
+
+    def _remember(self, key, verdict):
+        with self._lock:
+            self._cache[key] = verdict
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def predict(self, query, force=False):
+        """Return (intent, topic) from the LRU or the local model, or None when it is not confident.
+
+        With force=True the local verdict is returned regardless of confidence (used when the LLM is unreachable).
+        """
+        key = normalize(query)
+        verdict = self._cached(key)
+        if verdict is not None:
+            metrics.incr("intent.cache_hits")
+            return verdict
+
+        with metrics.timer("intent.local_seconds"):
+            p = self.probability(query)
+        confidence = max(p, 1.0 - p)
+        if confidence < self.threshold and not force:
+            metrics.incr("intent.local_unsure")
+            return None
+        verdict = (RUNBOOK, guess_topic(query)) if p >= 0.5 else (GENERAL, None)
+        metrics.incr("intent.local_verdicts")
+        if confidence >= self.threshold:
+            self._remember(key, verdict)
+        return verdict
+
+    def record(self, query, intent, topic):
+        """Remember an LLM verdict and log it as a training example."""
+        self._remember(normalize(query), (intent, topic))
+        metrics.incr("intent.llm_verdicts")
+        if self.log_path:
+            os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+            with self._log_lock, _file_lock(self.log_path + ".lock"), open(self.log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"query": query, "intent": intent, "topic": topic}) + "\n")
+        self._logged_since_train += 1
+        if INTENT_RETRAIN_EVERY and self._logged_since_train >= INTENT_RETRAIN_EVERY:
+            self._logged_since_train = 0
+            threading.Thread(target=self.train, kwargs={"blocking": False}, name="intent-retrain", daemon=True).start()
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def get_intent_classifier():
+    global _classifier
+    if not INTENT_LOCAL_ENABLED:
+        return None
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = IntentClassifier()
+    return _classifier
@@ -0,0 +1,269 @@
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import psycopg2
+from db import PG_CONN_STR, get_pool
+
+# limits hold across all API processes: jobs live in ingest_jobs and run slots are advisory locks
+INGEST_MAX_CONCURRENCY = int(os.getenv("INGEST_MAX_CONCURRENCY", "2"))
+INGEST_MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", "16"))
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "200"))
+# unfinished jobs not updated for this long (their process died) stop counting against the limits
+# and are reported as failed
+INGEST_JOB_STALE_SECONDS = float(os.getenv("INGEST_JOB_STALE_SECONDS", "300"))
+
+_PERSIST_INTERVAL = 0.5  # seconds between progress writes
+_HEARTBEAT = 30.0
+_LOCK_NAMESPACE = 0x1A6E57  # advisory lock classid; objid -1 guards submit, 0..n-1 are run slots
+_FIELDS = ("id", "filename", "doc_name", "stage", "chunks_total", "chunks_done", "result", "error",
+           "created_at", "started_at", "finished_at")
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class IngestionJob:
+    def __init__(self, filename, doc_name):
+        self.id = uuid.uuid4().hex
+        self.filename = filename
+        self.doc_name = doc_name
+        self.stage = "queued"
+        self.chunks_total = 0
+        self.chunks_done = 0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.on_update = None  # called with (job, stage_changed) after every update
+        self._persisted_at = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, **fields):
+        with self._lock:
+            stage_changed = fields.get("stage", self.stage) != self.stage
+            for key, value in fields.items():
+                setattr(self, key, value)
+        if self.on_update is not None:
+            self.on_update(self, stage_changed)
+
+    @classmethod
+    def from_row(cls, row):
+        job = cls.__new__(cls)
+        job.on_update = None
+        job._lock = threading.Lock()
+        for key, value in zip(_FIELDS, row):
+            setattr(job, key, value)
+        return job
+
+    def row(self):
+        with self._lock:
+            return tuple(json.dumps(self.result, default=str) if key == "result" else getattr(self, key)
+                         for key in _FIELDS)
+
+    @property
+    def finished(self):
+        return self.stage in ("done", "failed")
+
+    def to_dict(self):
+        with self._lock:
+            end = self.finished_at or time.time()
+            elapsed = end - self.started_at if self.started_at else 0.0
+            return {
+                "job_id": self.id,
+                "filename": self.filename,
+                "document_name": self.doc_name,
+                "stage": self.stage,
+                "chunks_total": self.chunks_total,
+                "chunks_done": self.chunks_done,
+                "elapsed_seconds": round(elapsed, 3),
+                "chunks_per_sec": round(self.chunks_done / elapsed, 1) if elapsed > 0 else None,
+                "result": self.result,
+                "error": self.error
+            }
+
+
+class JobStore:
+    """ingest_jobs rows, so any API process can report a job and the limits are global."""
+
+    def __init__(self, pool=None, stale_seconds=INGEST_JOB_STALE_SECONDS):
+        self.pool = pool or get_pool()
+        self.stale_seconds = stale_seconds
+
+    _PENDING_SQL = """
+        SELECT COUNT(*) FROM ingest_jobs
+        WHERE stage NOT IN ('done', 'failed') AND updated_at > now() - make_interval(secs => %s)
+    """
+
+    def insert(self, job, max_pending, history):
+        """Insert job unless max_pending jobs are already unfinished; drops finished jobs past history."""
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(%s, -1)", (_LOCK_NAMESPACE,))
+                cur.execute(self._PENDING_SQL, (self.stale_seconds,))
+                if cur.fetchone()[0] >= max_pending:
+                    conn.rollback()
+                    raise QueueFullError(f"Too many ingestion jobs in progress (limit {max_pending})")
+                cur.execute(f"INSERT INTO ingest_jobs ({', '.join(_FIELDS)}) VALUES ({', '.join(['%s'] * len(_FIELDS))})",
+                            job.row())
+                cur.execute("""
+                    DELETE FROM ingest_jobs WHERE id IN (
+                        SELECT id FROM ingest_jobs WHERE stage IN ('done', 'failed')
+                        ORDER BY created_at DESC OFFSET %s
+                    )
+                """, (history,))
+            conn.commit()
+
+    def save(self, job):
+        row = job.row()
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(f"UPDATE ingest_jobs SET ({', '.join(_FIELDS[1:])}, updated_at) = "
+                        f"({', '.join(['%s'] * (len(_FIELDS) - 1))}, now()) WHERE id = %s", row[1:] + row[:1])
+            conn.commit()
+
+    # running jobs are saved at least every _HEARTBEAT seconds, so a long silence means the process died
+    _STALE_COLUMN = "updated_at < now() - make_interval(secs => %s)"
+
+    def _job(self, row):
+        job = IngestionJob.from_row(row[:-1])
+        if row[-1] and not job.finished:
+            job.stage = "failed"
+            job.error = "Lost: the API process running this job stopped before it finished"
+        return job
+
+    def get(self, job_id):
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(f"SELECT {', '.join(_FIELDS)}, {self._STALE_COLUMN} FROM ingest_jobs WHERE id = %s",
+                        (self.stale_seconds, job_id))
+            row = cur.fetchone()
+        return self._job(row) if row else None
+
+    def recent(self, limit):
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT * FROM (
+                    SELECT {', '.join(_FIELDS)}, {self._STALE_COLUMN} FROM ingest_jobs ORDER BY created_at DESC LIMIT %s
+                ) latest ORDER BY created_at
+            """, (self.stale_seconds, limit))
+            return [self._job(row) for row in cur.fetchall()]
+
+
+class JobManager:
+    """Runs ingestion jobs on a bounded thread pool and keeps their progress for polling.
+
+    Jobs are written through to the JobStore, so under several API workers a job can be polled
+    through any of them. A job runs only after taking one of max_workers Postgres advisory
+    locks, which caps concurrency across processes; the lock goes away with its connection
+    if the process dies.
+    """
+
+    def __init__(self, max_workers=INGEST_MAX_CONCURRENCY, max_pending=INGEST_MAX_PENDING, history=INGEST_JOB_HISTORY,
+                 store=None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.history = history
+        self._store = store
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = JobStore()
+        return self._store
+
+    def pending_count(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def submit(self, filename, doc_name, fn, *args, **kwargs):
+        job = IngestionJob(filename, doc_name)
+        self.store.insert(job, self.max_pending, self.history)
+        job.on_update = self._persist
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self.executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _persist(self, job, stage_changed):
+        now = time.monotonic()
+        if not stage_changed and not job.finished and now - job._persisted_at < _PERSIST_INTERVAL:
+            return
+        job._persisted_at = now
+        try:
+            self.store.save(job)
+        except Exception as e:
+            print(f"Could not persist job {job.id}: {e}")
+
+    def _acquire_slot(self, job):
+        """Block until one of the global run slots is free; returns the connection holding it."""
+        conn = psycopg2.connect(PG_CONN_STR)
+        conn.autocommit = True
+        last_beat = time.monotonic()
+        try:
+            with conn.cursor() as cur:
+                while True:
+                    for slot in range(self.max_workers):
+                        cur.execute("SELECT pg_try_advisory_lock(%s, %s)", (_LOCK_NAMESPACE, slot))
+                        if cur.fetchone()[0]:
+                            return conn
+                    if time.monotonic() - last_beat > _HEARTBEAT:
+                        last_beat = time.monotonic()
+                        self._persist(job, True)  # keeps a long-queued job from looking stale
+                    time.sleep(0.5)
+        except BaseException:
+            conn.close()
+            raise
+
+    def _heartbeat(self, job, stop):
+        # steps such as an index build report no progress for minutes; keep the row fresh meanwhile
+        while not stop.wait(_HEARTBEAT):
+            self._persist(job, True)
+
+    def _run(self, job, fn, args, kwargs):
+        slot = None
+        try:
+            slot = self._acquire_slot(job)
+            job.update(stage="starting", started_at=time.time())
+            stop = threading.Event()
+            heartbeat = threading.Thread(target=self._heartbeat, args=(job, stop), daemon=True)
+            heartbeat.start()
+            try:
+                result = fn(*args, job=job, **kwargs)
+            finally:
+                stop.set()
+                heartbeat.join()  # so a late heartbeat cannot overwrite the final state
+            job.update(stage="done", result=result, finished_at=time.time())
+        except Exception as e:
+            traceback.print_exc()
+            job.update(stage="failed", error=str(e), finished_at=time.time())
+        finally:
+            if slot is not None:
+                slot.close()
+
+    def _prune(self):
+        while len(self._jobs) > self.history:
+            oldest_id = next((jid for jid, j in self._jobs.items() if j.finished), None)
+            if oldest_id is None:
+                break
+            del self._jobs[oldest_id]
+
+    def get(self, job_id):
+        """The job from this process, else as last persisted by whichever process runs it."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job if job is not None else self.store.get(job_id)
+
+    def list(self):
+        return self.store.recent(self.history)
+
+
+job_manager = JobManager()
@@ -0,0 +1,235 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, run a single process there
+    fcntl = None
+
+MEMORY_INDEX_DIR = os.getenv(
+    "MEMORY_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "vector_index")
+)
+MEMORY_INDEX_DTYPE = os.getenv("MEMORY_INDEX_DTYPE", "float32")  # float32 | float16
+MEMORY_INDEX_RELOAD_CHECK = float(os.getenv("MEMORY_INDEX_RELOAD_CHECK", "1.0"))
+
+_MANIFEST = "manifest.json"
+_LOCK_FILE = ".sync.lock"
+_SCORE_BLOCK = 65536
+_FETCH_SIZE = 2000
+
+ROWS_SQL = """
+    SELECT doc_name, chunk_id, chunk_text, page_number, embedding::real[]
+    FROM doc_chunks
+"""
+
+
+class _Snapshot:
+    def __init__(self, vectors, meta, version):
+        self.vectors = vectors
+        self.meta = meta
+        self.version = version
+
+
+class MemoryIndex:
+    """doc_chunks mirrored into a memory-mapped matrix plus a sidecar metadata file.
+
+    Files are replaced atomically on every sync and other processes pick up new versions
+    through the manifest, so several workers can share one copy in the page cache. Syncs are
+    serialised across processes with a file lock and merge into the latest version on disk;
+    a replaced generation stays on disk until the sync after next, so a reader holding the
+    previous manifest can still open it.
+    """
+
+    def __init__(self, directory=MEMORY_INDEX_DIR, dtype=MEMORY_INDEX_DTYPE):
+        self.directory = directory
+        self.dtype = np.dtype(dtype)
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+
+    @property
+    def size(self):
+        snap = self._snapshot
+        return 0 if snap is None else len(snap.meta)
+
+    @property
+    def version(self):
+        """Version of the mapped generation; None until one has been loaded or built, even an empty one."""
+        snap = self._snapshot
+        return None if snap is None else snap.version
+
+    def _manifest_path(self):
+        return os.path.join(self.directory, _MANIFEST)
+
+    @contextmanager
+    def _sync_lock(self):
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, _LOCK_FILE), "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load(self):
+        """Map the latest version on disk; returns False when no index has been built yet."""
+        manifest = self._read_manifest()
+        if manifest is None:
+            return False
+        vectors = np.load(os.path.join(self.directory, manifest["vectors"]), mmap_mode="r")
+        with open(os.path.join(self.directory, manifest["meta"]), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        self._snapshot = _Snapshot(vectors, meta, manifest["version"])
+        return True
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._last_check < MEMORY_INDEX_RELOAD_CHECK:
+            return
+        self._last_check = now
+        manifest = self._read_manifest()
+        snap = self._snapshot
+        if manifest and (snap is None or manifest["version"] != snap.version):
+            with self._lock:
+                self.load()
+
+    def _write(self, vectors, meta):
+        os.makedirs(self.directory, exist_ok=True)
+        version = f"{time.time_ns():x}"
+        vectors_file, meta_file = f"vectors-{version}.npy", f"meta-{version}.json"
+        out = np.lib.format.open_memmap(
+            os.path.join(self.directory, vectors_file), mode="w+", dtype=self.dtype,
+            shape=(len(meta), vectors.shape[1] if len(meta) else 0)
+        )
+        if len(meta):
+            out[:] = vectors
+        out.flush()
+        del out
+        with open(os.path.join(self.directory, meta_file), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+        previous = self._read_manifest()
+        tmp = self._manifest_path() + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": version, "vectors": vectors_file, "meta": meta_file, "dtype": self.dtype.name}, f)
+        os.replace(tmp, self._manifest_path())
+        self.load()
+
+        # keep the generation just replaced for processes still about to open it; older ones have
+        # been superseded for a whole sync, and unlinking leaves existing mmaps intact
+        keep = {vectors_file, meta_file, _MANIFEST, _LOCK_FILE}
+        if previous:
+            keep.update((previous["vectors"], previous["meta"]))
+        for name in os.listdir(self.directory):
+            if name not in keep and name.startswith(("vectors-", "meta-")):
+                try:
+                    os.unlink(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def _fetch(self, conn, doc_names=None):
+        vectors, meta = [], []
+        with conn.cursor(name="memory_index_sync") as cur:
+            cur.itersize = _FETCH_SIZE
+            if doc_names is None:
+                cur.execute(ROWS_SQL + " ORDER BY doc_name, chunk_id")
+            else:
+                cur.execute(ROWS_SQL + " WHERE doc_name = ANY(%s) ORDER BY doc_name, chunk_id", (list(doc_names),))
+            for doc_name, chunk_id, text, page_number, embedding in cur:
+                meta.append([doc_name, chunk_id, text, page_number])
+                vectors.append(np.asarray(embedding, dtype=np.float32))
+        conn.rollback()
+        return (np.vstack(vectors) if vectors else np.empty((0, 0), dtype=np.float32)), meta
+
+    def rebuild(self, conn):
+        with self._sync_lock():
+            vectors, meta = self._fetch(conn)
+            self._write(vectors, meta)
+        return self.size
+
+    def ensure_built(self, conn):
+        """Map the latest version on disk, building it from doc_chunks only if no process has yet."""
+        if self.version is not None or self.load():
+            return False
+        with self._sync_lock():
+            if self.load():
+                return False
+            vectors, meta = self._fetch(conn)
+            self._write(vectors, meta)
+        return True
+
+    def sync_documents(self, conn, doc_names):
+        """Replace the rows of doc_names with their current contents in Postgres."""
+        with self._sync_lock():
+            # merge into the latest version on disk, which another process may have written
+            if not self.load():
+                vectors, meta = self._fetch(conn)
+                self._write(vectors, meta)
+                return self.size
+            snap = self._snapshot
+            changed = set(doc_names)
+            keep = [i for i, row in enumerate(snap.meta) if row[0] not in changed]
+            fresh_vectors, fresh_meta = self._fetch(conn, changed)
+            parts = [np.asarray(snap.vectors[keep], dtype=np.float32)] if keep else []
+            if fresh_meta:
+                parts.append(fresh_vectors)
+            vectors = np.vstack(parts) if parts else np.empty((0, 0), dtype=np.float32)
+            self._write(vectors, [snap.meta[i] for i in keep] + fresh_meta)
+        return self.size
+
+    def _scores(self, vectors, queries):
+        if vectors.dtype == np.float32:
+            return queries @ vectors.T
+        # upcast in blocks so float16 storage never materialises a full float32 copy
+        out = np.empty((queries.shape[0], vectors.shape[0]), dtype=np.float32)
+        for start in range(0, vectors.shape[0], _SCORE_BLOCK):
+            block = np.asarray(vectors[start:start + _SCORE_BLOCK], dtype=np.float32)
+            out[:, start:start + _SCORE_BLOCK] = queries @ block.T
+        return out
+
+    def search(self, queries, top_k):
+        """Top-k cosine search for normalised query vectors; returns per query [(meta_row, similarity), ...]."""
+        self._maybe_reload()
+        snap = self._snapshot
+        if snap is None or not snap.meta:
+            return [[] for _ in range(len(queries))]
+
+        queries = np.asarray(queries, dtype=np.float32).reshape(-1, snap.vectors.shape[1])
+        scores = self._scores(snap.vectors, queries)
+        k = min(top_k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in enumerate(top):
+            ordered = candidates[np.argsort(-scores[row, candidates])]
+            results.append([(snap.meta[i], float(scores[row, i])) for i in ordered])
+        return results
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_memory_index():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = MemoryIndex()
+                _index.load()
+    return _index
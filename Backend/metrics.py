@@ -0,0 +1,112 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+_WINDOW = 1024
+
+_lock = threading.Lock()
+_counters = {}
+_timings = {}
+
+
+class _Timing:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=_WINDOW)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.recent.append(seconds)
+
+    def summary(self):
+        ordered = sorted(self.recent)
+
+        def pct(p):
+            return round(ordered[min(int(p * len(ordered)), len(ordered) - 1)], 6) if ordered else None
+
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 6) if self.count else None,
+            "p50": pct(0.50),
+            "p95": pct(0.95),
+            "p99": pct(0.99),
+            "max": round(self.max, 6)
+        }
+
+
+def incr(name, value=1):
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name, value):
+    with _lock:
+        _counters[name] = value
+
+
+def observe(name, seconds):
+    with _lock:
+        timing = _timings.get(name)
+        if timing is None:
+            timing = _timings[name] = _Timing()
+        timing.add(seconds)
+
+
+@contextmanager
+def timer(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def snapshot():
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "timings_seconds": {name: t.summary() for name, t in _timings.items()}
+        }
+
+
+class StageTimer:
+    """Per-request stage timings (relative to request start); every stage is also fed into the global timings."""
+
+    def __init__(self, prefix="answer"):
+        self.prefix = prefix
+        self.origin = time.perf_counter()
+        self.stages = {}
+        self.cancelled = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.stages[name] = {
+                "start_ms": round((start - self.origin) * 1000, 1),
+                "duration_ms": round((end - start) * 1000, 1)
+            }
+            observe(f"{self.prefix}.{name}_seconds", end - start)
+
+    def mark(self, name):
+        """Record a point in time, e.g. the first streamed token; observed as seconds since request start."""
+        elapsed = time.perf_counter() - self.origin
+        self.stages[name] = {"start_ms": round(elapsed * 1000, 1), "duration_ms": 0.0}
+        observe(f"{self.prefix}.{name}_seconds", elapsed)
+
+    def cancel(self, name):
+        self.cancelled.append(name)
+        incr(f"{self.prefix}.{name}_cancelled")
+
+    def as_dict(self):
+        total = time.perf_counter() - self.origin
+        observe(f"{self.prefix}.total_seconds", total)
+        return {"total_ms": round(total * 1000, 1), "stages": self.stages, "cancelled": self.cancelled}
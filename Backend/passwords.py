@@ -0,0 +1,95 @@
+import os
+import threading
+import time
+import bcrypt
+import metrics
+from executors import run_in, EXECUTOR_SIZES
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# hash/verify calls admitted at once (running + queued); beyond that callers are turned away
+BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", "32"))
+
+
+class PasswordQueueFull(Exception):
+    pass
+
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+def hash_rounds(hashed_password: str):
+    # $2b$12$<salt+hash>
+    try:
+        return int(hashed_password.split("$")[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    """bcrypt on the size-capped "bcrypt" executor (bcrypt releases the GIL, so threads scale
+    to cores) with a cap on pending work, so a login burst queues here, not in the threadpool
+    other requests use."""
+
+    def __init__(self, rounds=BCRYPT_ROUNDS, max_pending=BCRYPT_MAX_PENDING):
+        self.rounds = rounds
+        self.max_pending = max_pending
+        self.workers = EXECUTOR_SIZES["bcrypt"]
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _admit(self, delta):
+        with self._lock:
+            if delta > 0 and self._pending >= self.max_pending:
+                metrics.incr("passwords.rejected")
+                raise PasswordQueueFull(f"{self._pending} password operations pending")
+            self._pending += delta
+            metrics.set_gauge("passwords.pending", self._pending)
+            metrics.set_gauge("passwords.queued", max(self._pending - self.workers, 0))
+
+    async def _run(self, name, fn, *args):
+        self._admit(1)
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            metrics.observe("passwords.queue_wait_seconds", started - submitted)
+            try:
+                return fn(*args)
+            finally:
+                metrics.observe(f"passwords.{name}_seconds", time.perf_counter() - started)
+
+        try:
+            return await run_in("bcrypt", job)
+        finally:
+            self._admit(-1)
+
+    async def hash(self, password):
+        return await self._run("hash", hash_password, password, self.rounds)
+
+    async def verify(self, password, hashed_password):
+        return await self._run("verify", verify_password, password, hashed_password)
+
+    def needs_rehash(self, hashed_password):
+        return hash_rounds(hashed_password) != self.rounds
+
+    def stats(self):
+        return {"rounds": self.rounds, "workers": self.workers, "max_pending": self.max_pending,
+                "pending": self._pending}
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def get_password_hasher():
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                _hasher = PasswordHasher()
+    return _hasher
@@ -1,45 +1,106 @@
+import asyncio
 import os
+import threading
+import weakref
 from dotenv import load_dotenv
 from retriever import Retriever
-from groq import Groq
+from metrics import StageTimer
+from answer_cache import get_answer_cache
+from intent_classifier import INTENT_EXAMPLES, get_intent_classifier
+from context_builder import assemble_context, trim_history
+from reranker import get_reranker
+from executors import run_in
 
 load_dotenv()
 
-client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+_client = None
+_retriever = None
+_init_lock = threading.Lock()
+
+
+def get_client():
+    # groq (and its httpx/pydantic stack) is imported on first use, not when the API starts
+    global _client
+    if _client is None:
+        with _init_lock:
+            if _client is None:
+                from groq import Groq
+                _client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+    return _client
+
+
+def get_retriever():
+    global _retriever
+    if _retriever is None:
+        with _init_lock:
+            if _retriever is None:
+                _retriever = Retriever()
+    return _retriever
 
-retriever = Retriever()
 MIN_SIMILARITY = 0.55  # Threshold to filter irrelevant documents
 
+CONDENSE_MODEL = "llama-3.3-70b-versatile"
+CLASSIFY_MODEL = "llama-3.1-8b-instant"
+ANSWER_MODEL = "llama-3.3-70b-versatile"
+
+# AsyncGroq keeps an httpx pool bound to the loop it was first used on, so keep one per loop
+_async_clients = weakref.WeakKeyDictionary()
+
+def get_async_client():
+    loop = asyncio.get_running_loop()
+    async_client = _async_clients.get(loop)
+    if async_client is None:
+        from groq import AsyncGroq
+        async_client = _async_clients[loop] = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"))
+    return async_client
+
+_loop = None
+_loop_lock = threading.Lock()
+
+def _run_sync(coro):
+    """Run a pipeline coroutine from sync code on a long-lived background loop."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="answer-pipeline", daemon=True).start()
+                _loop = loop
+    return asyncio.run_coroutine_threadsafe(coro, _loop).result()
+
 def build_context(docs):
     ctx = ""
     for d in docs:
         ctx += f"\n\n--- Retrieved Chunk (score={d['score']:.3f}) ---\n{d['text']}"
     return ctx
 
-def condense_query(chat_history, latest_query):
-    if not chat_history:
-        return latest_query
-
+def _condense_messages(chat_history, latest_query):
     history_str = ""
     # Increase window for condensation to 10 messages for better context
     for msg in chat_history[-10:]:
         role = "User" if msg['role'] == "user" else "Assistant"
         history_str += f"{role}: {msg['content']}\n"
-    
-    prompt = f"""Given the conversation, rephrase the Follow Up Input to be a standalone question. 
+
+    prompt = f"""Given the conversation, rephrase the Follow Up Input to be a standalone question.
 If the input is already standalone, return it unchanged.
 Chat History:
 {history_str}
 Follow Up Input: {latest_query}
 Standalone Question:"""
 
+    return [
+        {"role": "system", "content": "You are a helpful assistant. Rephrase query to be standalone. output ONLY the question."},
+        {"role": "user", "content": prompt}
+    ]
+
+def condense_query(chat_history, latest_query):
+    if not chat_history:
+        return latest_query
+
     try:
-        response = client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant. Rephrase query to be standalone. output ONLY the question."},
-                {"role": "user", "content": prompt}
-            ],
+        response = get_client().chat.completions.create(
+            model=CONDENSE_MODEL,
+            messages=_condense_messages(chat_history, latest_query),
             temperature=0.1,
             max_tokens=200
         )
@@ -48,8 +109,33 @@ Standalone Question:"""
         print(f"Condensation error: {e}")
         return latest_query
 
-def classify_intent(query):
-    system_prompt = """You are a Technical Intent Classifier for SAP Treasury and Risk Management (TRM).
+async def condense_query_async(chat_history, latest_query):
+    if not chat_history:
+        return latest_query
+
+    try:
+        response = await get_async_client().chat.completions.create(
+            model=CONDENSE_MODEL,
+            messages=_condense_messages(chat_history, latest_query),
+            temperature=0.1,
+            max_tokens=200
+        )
+        return response.choices[0].message.content.strip()
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"Condensation error: {e}")
+        return latest_query
+
+def _intent_examples(intent):
+    lines = []
+    for example, example_intent, topic in INTENT_EXAMPLES:
+        if example_intent == intent:
+            verdict = f"INTENT: {intent} | TOPIC: {topic}" if topic else f"INTENT: {intent}"
+            lines.append(f'- "{example}" -> {verdict}')
+    return "\n".join(lines)
+
+INTENT_SYSTEM_PROMPT = f"""You are a Technical Intent Classifier for SAP Treasury and Risk Management (TRM).
 
 Analyze if the user wants a FORMAL PROCEDURE, RUNBOOK, STEP-BY-STEP GUIDE, CONFIGURATION SETUP, or TROUBLESHOOTING STEPS.
 These are "procedural" queries that need detailed instructions.
@@ -58,42 +144,82 @@ If the user asks for a simple explanation, definition, or "short" clarification,
 
 If the query is procedural/technical (asking HOW TO DO something), output: INTENT: RUNBOOK_REQUEST | TOPIC: <brief 2-3 word topic>
 Examples:
-- "How do I settle a deal?" -> INTENT: RUNBOOK_REQUEST | TOPIC: Deal Settlement
-- "What are the steps for month end?" -> INTENT: RUNBOOK_REQUEST | TOPIC: Month-End Procedures
-- "Troubleshoot OT84 errors" -> INTENT: RUNBOOK_REQUEST | TOPIC: OT84 Troubleshooting
-- "Configure product types" -> INTENT: RUNBOOK_REQUEST | TOPIC: Product Type Setup
+{_intent_examples('RUNBOOK_REQUEST')}
 
 If they just want a definition, list, background information, or explanation (asking WHAT IS something or "EXPLAIN" something), output: INTENT: GENERAL_QUERY
 Examples:
-- "What is Portfolio Analyzer?" -> INTENT: GENERAL_QUERY
-- "Explain FX risk" -> INTENT: GENERAL_QUERY
-- "What is a business partner?" -> INTENT: GENERAL_QUERY
-- "Explain it in short" -> INTENT: GENERAL_QUERY
-- "List the types of treasury instruments" -> INTENT: GENERAL_QUERY
+{_intent_examples('GENERAL_QUERY')}
 """
+
+def _classify_messages(query):
+    return [
+        {"role": "system", "content": INTENT_SYSTEM_PROMPT},
+        {"role": "user", "content": query}
+    ]
+
+def _parse_intent(content):
+    if "RUNBOOK_REQUEST" in content:
+        topic = "this topic"
+        if "TOPIC:" in content:
+            topic = content.split("TOPIC:")[1].strip()
+        return 'RUNBOOK_REQUEST', topic
+    return 'GENERAL_QUERY', None
+
+def _local_intent(query, force=False):
+    """Local classifier verdict (or None when unsure); errors fall through to the LLM."""
+    classifier = get_intent_classifier()
+    if classifier is None:
+        return None
+    try:
+        return classifier.predict(query, force=force)
+    except Exception as e:
+        print(f"Local intent classifier error: {e}")
+        return None
+
+def _record_intent(query, verdict):
+    classifier = get_intent_classifier()
+    if classifier is not None:
+        classifier.record(query, *verdict)
+
+def classify_intent(query):
+    verdict = _local_intent(query)
+    if verdict:
+        return verdict
     try:
-        response = client.chat.completions.create(
-            model="llama-3.1-8b-instant", 
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": query}
-            ],
+        response = get_client().chat.completions.create(
+            model=CLASSIFY_MODEL,
+            messages=_classify_messages(query),
             temperature=0.0,
             max_tokens=60
         )
-        content = response.choices[0].message.content.strip()
-        if "RUNBOOK_REQUEST" in content:
-            topic = "this topic"
-            if "TOPIC:" in content:
-                topic = content.split("TOPIC:")[1].strip()
-            return 'RUNBOOK_REQUEST', topic
-        return 'GENERAL_QUERY', None
+        verdict = _parse_intent(response.choices[0].message.content.strip())
     except:
-        return 'GENERAL_QUERY', None
+        return _local_intent(query, force=True) or ('GENERAL_QUERY', None)
+    _record_intent(query, verdict)
+    return verdict
+
+async def classify_intent_async(query):
+    verdict = await run_in("embed", _local_intent, query)
+    if verdict:
+        return verdict
+    try:
+        response = await get_async_client().chat.completions.create(
+            model=CLASSIFY_MODEL,
+            messages=_classify_messages(query),
+            temperature=0.0,
+            max_tokens=60
+        )
+        verdict = _parse_intent(response.choices[0].message.content.strip())
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        return await run_in("embed", _local_intent, query, True) or ('GENERAL_QUERY', None)
+    await run_in("embed", _record_intent, query, verdict)
+    return verdict
 
 def get_runbook(filename):
     base_path = os.path.join(os.getcwd(), "runbooks")
-    
+
     filename_map = {
         'operational': '01_SAP_TRM_Operational_Procedures',
         'incident': '02_SAP_TRM_Incident_Response',
@@ -102,43 +228,182 @@ def get_runbook(filename):
         'system_config': 'system_config',
         'backup_recovery': 'backup_recovery'
     }
-    
+
     actual_filename = filename_map.get(filename, filename)
-    
+
     file_path = os.path.join(base_path, actual_filename)
-    
+
     if not os.path.abspath(file_path).startswith(base_path):
         return "Error: Access denied."
-    
+
     if os.path.exists(file_path):
         with open(file_path, "r", encoding='utf-8') as f:
             return f.read()
-    
+
     for ext in ['.md', '.txt', '.json', '.yaml', '.yml']:
         file_with_ext = os.path.join(base_path, actual_filename + ext)
         if os.path.exists(file_with_ext):
             with open(file_with_ext, "r", encoding='utf-8') as f:
                 return f.read()
-    
+
     for f in os.listdir(base_path):
         if actual_filename.lower() in f.lower() or f.lower() in actual_filename.lower():
              with open(os.path.join(base_path, f), "r", encoding='utf-8') as f_obj:
                 return f_obj.read()
-                
+
     return f"I couldn't find a runbook named '{filename}'. Available files: {', '.join(os.listdir(base_path))}"
 
-def answer_question(query, conversation_history=None):
+async def _timed(timer, name, awaitable):
+    with timer.stage(name):
+        return await awaitable
+
+async def _cancel(timer, name, task):
+    """Cancel a pipeline stage that is no longer needed (or whose client went away).
+
+    Cancelling drops executor jobs that have not started yet and stops the stage at its next
+    await, but a job already running on the embed pool finishes in its thread; stages are split
+    into short executor jobs (see _retrieve) so little runs on after a cancel.
+    """
+    if task is not None and not task.done():
+        task.cancel()
+        timer.cancel(name)
+        try:
+            await task
+        except (asyncio.CancelledError, Exception):
+            pass
+
+async def _retrieve(timer, name, search_query, retrieval_options):
+    # encode and search as separate executor jobs, so a retrieval cancelled while encoding does not go on to the database
+    retriever = get_retriever()
+    with timer.stage(name):
+        embedding = await run_in("embed", retriever.encode, search_query)
+        return await run_in("embed", retriever.search, search_query, embedding, top_k=10, **retrieval_options)
+
+async def _condense_and_retrieve(timer, chat_history, query, retrieval_options, pending_condense=None):
+    """Condense the query while speculatively retrieving on the raw text; keep the speculative hits if condensation was a no-op."""
+    speculative = asyncio.create_task(_retrieve(timer, "retrieve_speculative", query, retrieval_options))
+    try:
+        if pending_condense is not None:
+            search_query = await pending_condense
+        elif chat_history:
+            search_query = await _timed(timer, "condense", condense_query_async(chat_history, query))
+        else:
+            search_query = query
+    except BaseException:
+        await _cancel(timer, "retrieve_speculative", speculative)
+        raise
+
+    if search_query.strip().lower() == query.strip().lower():
+        return search_query, await speculative
+    if speculative.done():
+        timer.cancel("retrieve_speculative")  # finished first, but on the wrong query
+    else:
+        await _cancel(timer, "retrieve_speculative", speculative)
+    return search_query, await _retrieve(timer, "retrieve", search_query, retrieval_options)
+
+async def _rerank(timer, search_query, hits):
+    reranker = get_reranker()
+    if reranker is None or len(hits) <= 1:
+        return hits
+    return await _timed(timer, "rerank", run_in("embed", reranker.rerank, search_query, hits))
+
+async def _generate(timer, messages):
+    async def call():
+        response = await get_async_client().chat.completions.create(
+            model=ANSWER_MODEL,
+            messages=messages,
+            temperature=0.1,
+            max_tokens=800
+        )
+        return response.choices[0].message.content.strip()
+    return await _timed(timer, "generate", call())
+
+async def _generate_stream(timer, messages):
+    with timer.stage("generate"):
+        stream = await get_async_client().chat.completions.create(
+            model=ANSWER_MODEL,
+            messages=messages,
+            temperature=0.1,
+            max_tokens=800,
+            stream=True
+        )
+        first = True
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if first:
+                    timer.mark("first_token")
+                    first = False
+                yield delta
+
+async def _lookup_answer(timer, cache, query, pending_condense):
+    search_query = await pending_condense if pending_condense is not None else query
+    with timer.stage("answer_cache"):
+        vector = (await run_in("embed", get_retriever().embedder.encode_queries, [search_query]))[0]
+        hit = cache.lookup(vector)
+    return search_query, vector, hit
+
+def _store_answer(pending, result):
+    """Cache a freshly generated answer under the standalone query _prepare looked up."""
+    if pending.get("cache_key") and result.get("answer"):
+        search_query, vector = pending["cache_key"]
+        get_answer_cache().store(search_query, vector, result)
+
+async def answer_question_async(query, conversation_history=None, retrieval_options=None):
+    """Answer pipeline; independent stages (intent, condensation, retrieval) run concurrently and a per-stage timing breakdown is attached."""
+    timer = StageTimer()
+    pending = {}
+    result, messages = await _prepare(timer, query, conversation_history, retrieval_options or {}, pending)
+    if messages is not None:
+        result = {"answer": await _generate(timer, messages), **result}
+        _store_answer(pending, result)
+    result["timings"] = timer.as_dict()
+    return result
+
+def answer_question(query, conversation_history=None, retrieval_options=None):
+    return _run_sync(answer_question_async(query, conversation_history, retrieval_options))
+
+async def answer_question_stream(query, conversation_history=None, retrieval_options=None):
+    """Streaming variant of answer_question, yielding (event, data) pairs.
+
+    "meta" (sources, intent, runbook flags) comes first, then one "token" per LLM delta,
+    then "done" with the full answer and timings.
+    """
+    timer = StageTimer()
+    pending = {}
+    result, messages = await _prepare(timer, query, conversation_history, retrieval_options or {}, pending)
+    yield "meta", {k: v for k, v in result.items() if k != "answer"}
+
+    if messages is None:
+        answer = result["answer"]
+        timer.mark("first_token")
+        yield "token", {"text": answer}
+    else:
+        parts = []
+        async for delta in _generate_stream(timer, messages):
+            parts.append(delta)
+            yield "token", {"text": delta}
+        answer = "".join(parts).strip()
+        _store_answer(pending, {"answer": answer, **result})
+
+    yield "done", {"answer": answer, "timings": timer.as_dict()}
+
+async def _prepare(timer, query, conversation_history, retrieval_options, pending):
+    """Everything up to generation: returns (result, messages), messages being None when the result is already final.
+    A cache key for the answer still to be generated is left in pending."""
     confirmation_keywords = ['yes', 'confirm', 'get it', 'show me', 'please', 'go ahead', 'sure', 'ok', 'okay']
     denial_keywords = ['no', 'later', 'skip', 'don\'t', 'stop', 'nope', 'nevermind', 'n', 'close']
-    
+
     is_simple_confirmation = any(keyword in query.lower() for keyword in confirmation_keywords) and len(query.split()) <= 5
     is_simple_denial = any(keyword in query.lower() for keyword in denial_keywords) and len(query.split()) <= 5
-    
+
     force_general_query = False
-    
+
     if (is_simple_confirmation or is_simple_denial) and conversation_history and len(conversation_history) > 0:
         last_message = conversation_history[-1].get('content', '') if conversation_history[-1].get('role') == 'assistant' else ''
-        
+
         # New Interactive Portions Logic
         if "Would you like me to retrieve the formal runbook portion" in last_message:
             if is_simple_denial:
@@ -151,31 +416,25 @@ def answer_question(query, conversation_history=None):
                     if msg['role'] == 'user' and len(msg['content'].split()) > 2:
                         original_query = msg['content']
                         break
-                
+
                 if original_query:
                     print(f"DEBUG: Processing confirmation for technical query: {original_query}")
-                    search_query = condense_query(conversation_history[:-1], original_query)
-                    hits = retriever.query(search_query, top_k=10)
+                    search_query, hits = await _condense_and_retrieve(timer, conversation_history[:-1], original_query, retrieval_options)
                     valid_hits = [h for h in hits if (1.0 - h['score']) >= MIN_SIMILARITY]
-                    
+
                     if not valid_hits:
-                        return {"answer": "I found the corresponding section, but it doesn't contain enough specific procedural detail to display as a runbook portion.", "sources": []}
-                    
-                    context = build_context(valid_hits)
-                    response = client.chat.completions.create(
-                        model="llama-3.3-70b-versatile",
-                        messages=[
-                            {"role": "system", "content": """You are a SAP TRM Expert. Extract the SPECIFIC procedural or technical portion requested.
+                        return {"answer": "I found the corresponding section, but it doesn't contain enough specific procedural detail to display as a runbook portion.", "sources": []}, None
+
+                    valid_hits = await _rerank(timer, search_query, valid_hits)
+                    context, blocks, context_report = await run_in("embed", assemble_context, valid_hits)
+                    messages = [
+                        {"role": "system", "content": """You are a SAP TRM Expert. Extract the SPECIFIC procedural or technical portion requested.
     Formatting: Use "## 📋 [Procedure Name]", separators "---", numbered steps, and highlight T-Codes.
     If multiple steps are involved, list them clearly. End with source attribution."""},
-                            {"role": "user", "content": f"Context:\n{context}\n\nTask: Provide the specific portion for '{original_query}'.\nAnswer:"}
-                        ],
-                        temperature=0.1,
-                        max_tokens=800
-                    )
-                    answer = response.choices[0].message.content.strip()
-                    sources_list = list(set([h['doc_name'] for h in valid_hits]))
-                    return {"answer": answer, "sources": sources_list, "is_runbook": True}
+                        {"role": "user", "content": f"Context:\n{context}\n\nTask: Provide the specific portion for '{original_query}'.\nAnswer:"}
+                    ]
+                    sources_list = list(set([b.doc_name for b in blocks]))
+                    return {"sources": sources_list, "is_runbook": True, "intent": "RUNBOOK_REQUEST", "context": context_report}, messages
 
         # Legacy Full Runbook Logic (keeping for compatibility)
         if 'Would you like me to retrieve' in last_message and 'portion' not in last_message:
@@ -195,8 +454,8 @@ def answer_question(query, conversation_history=None):
                     if friendly in last_message:
                         content = get_runbook(actual)
                         formatted_content = f"# 📘 {friendly}\n\n---\n\n{content}\n\n---\n\n**Document Source**: `runbooks/{actual}.md`  \n**Retrieved**: {friendly} runbook from local system"
-                        return {"answer": formatted_content, "sources": ["Local Runbook System"]}
-    
+                        return {"answer": formatted_content, "sources": ["Local Runbook System"]}, None
+
     if force_general_query:
         # Re-resolve the original query from the context if possible
         original_query = query
@@ -205,40 +464,92 @@ def answer_question(query, conversation_history=None):
                 original_query = msg['content']
                 break
         query = original_query
-        intent_type = 'GENERAL_QUERY'
-        topic_hint = None
-    else:
-        intent_type, topic_hint = classify_intent(query)
 
-    print(f"DEBUG: Intent detected: {intent_type} (Topic: {topic_hint})")
+    # Intent classification and condensation are independent: start both right away
+    classify_task = None
+    if not force_general_query:
+        classify_task = asyncio.create_task(_timed(timer, "classify_intent", classify_intent_async(query)))
+    condense_task = None
+    if conversation_history:
+        condense_task = asyncio.create_task(_timed(timer, "condense", condense_query_async(conversation_history, query)))
+    retrieval_task = asyncio.create_task(
+        _condense_and_retrieve(timer, conversation_history, query, retrieval_options, pending_condense=condense_task)
+    )
 
-    if intent_type == 'RUNBOOK_REQUEST' and not is_simple_confirmation:
-        return {
-            "answer": f"I understand you're looking for information about **{topic_hint}**. Would you like me to retrieve the formal runbook portion for this?",
-            "sources": [],
-            "is_runbook": False
-        }
+    # Semantic answer cache, consulted only for GENERAL_QUERY intents. Without history the raw
+    # query is the key, so it is embedded while the classifier runs, without waiting on condensation.
+    cache = get_answer_cache()
+    cache_status = None
+    cache_key = None
+    lookup_task = None
+    if cache is not None and not conversation_history:
+        lookup_task = asyncio.create_task(_lookup_answer(timer, cache, query, None))
 
-    search_query = query
-    if conversation_history:
-        search_query = condense_query(conversation_history, query)
+    try:
+        if classify_task is not None:
+            intent_type, topic_hint = await classify_task
+        else:
+            intent_type, topic_hint = 'GENERAL_QUERY', None
+
+        print(f"DEBUG: Intent detected: {intent_type} (Topic: {topic_hint})")
+
+        if intent_type == 'RUNBOOK_REQUEST' and not is_simple_confirmation:
+            await _cancel(timer, "answer_cache", lookup_task)
+            await _cancel(timer, "condense_and_retrieve", retrieval_task)
+            await _cancel(timer, "condense", condense_task)
+            return {
+                "answer": f"I understand you're looking for information about **{topic_hint}**. Would you like me to retrieve the formal runbook portion for this?",
+                "sources": [],
+                "is_runbook": False,
+                "intent": intent_type,
+                "cache": cache_status
+            }, None
+
+        if cache is not None and intent_type == 'GENERAL_QUERY':
+            if lookup_task is None:  # follow-up: look up the condensed, standalone question
+                lookup_task = asyncio.create_task(_lookup_answer(timer, cache, query, condense_task))
+            key_query, vector, cached = await lookup_task
+            cache_status = "miss"
+            cache_key = (key_query, vector)
+            if cached is not None:
+                cached_result, similarity, cached_query = cached
+                print(f"DEBUG: Answer cache hit ({similarity:.3f}) '{key_query}' ~ '{cached_query}'")
+                await _cancel(timer, "condense_and_retrieve", retrieval_task)
+                return {**cached_result, "cache": "hit"}, None
+        else:
+            await _cancel(timer, "answer_cache", lookup_task)
+
+        search_query, hits = await retrieval_task
+    except BaseException:
+        await _cancel(timer, "answer_cache", lookup_task)
+        await _cancel(timer, "classify_intent", classify_task)
+        await _cancel(timer, "condense_and_retrieve", retrieval_task)
+        await _cancel(timer, "condense", condense_task)
+        raise
+
+    if search_query != query:
         print(f"DEBUG: Condensed '{query}' -> '{search_query}'")
 
-    hits = retriever.query(search_query, top_k=10)
-    
     # Filter hits based on similarity threshold
     valid_hits = [h for h in hits if (1.0 - h['score']) >= MIN_SIMILARITY]
     print(f"DEBUG: Retrieval found {len(hits)} hits, {len(valid_hits)} above threshold {MIN_SIMILARITY}")
-    
+
     if not valid_hits:
         return {
-            "answer": "I don't have enough information in my knowledge base to answer this. The requested topic does not appear to be related to SAP Treasury and Risk Management (TRM) documentation.", 
+            "answer": "I don't have enough information in my knowledge base to answer this. The requested topic does not appear to be related to SAP Treasury and Risk Management (TRM) documentation.",
             "sources": [],
-            "is_runbook": False
-        }
+            "is_runbook": False,
+            "intent": intent_type,
+            "cache": cache_status
+        }, None
+
+    # Optional cross-encoder pass keeps only the best few passages
+    valid_hits = await _rerank(timer, search_query, valid_hits)
+
+    # Merge neighbouring chunks, drop near-duplicates and fit the context into the token budget
+    # tokenizing is CPU work, so it stays off the event loop like embedding
+    context, blocks, context_report = await run_in("embed", assemble_context, valid_hits)
 
-    context = build_context(valid_hits)
-    
     RUNBOOK_PROMPT = """You are a SAP TRM Expert. The user wants a FORMAL PROCEDURE or RUNBOOK section.
 CRITICAL: Use this distinctive formatting:
 - Use "## 📋 [Procedure Name]" for main headers
@@ -264,32 +575,24 @@ Provide helpful, accurate responses using the Context when it's relevant to SAP
 Use markdown for readability but DO NOT use formal runbook/procedure headers."""
 
     active_prompt = RUNBOOK_PROMPT if intent_type == 'RUNBOOK_REQUEST' else CHAT_PROMPT
-    
+
     # Prepare messages for final generation
     messages = [{"role": "system", "content": active_prompt}]
-    
+
     # Add recent history (last 15 messages) for much better contextual awareness
     if conversation_history:
-        # We take the last 15 messages to provide deep context without hitting token limits
-        for msg in conversation_history[-15:]:
+        # Up to 15 messages, trimmed from the oldest end to the history token budget
+        history, context_report["history_tokens_saved"] = await run_in("embed", trim_history, conversation_history[-15:])
+        for msg in history:
             messages.append({"role": msg['role'], "content": msg['content']})
 
     # Prepare prompt with context
     final_user_prompt = f"Using the provided Context below (and our conversation history above if relevant), please answer the question.\n\nContext:\n{context}\n\nQuestion: {query}"
     messages.append({"role": "user", "content": final_user_prompt})
 
-    response = client.chat.completions.create(
-        model="llama-3.3-70b-versatile",
-        messages=messages,
-        temperature=0.1,
-        max_tokens=800
-    )
-    
-    answer = response.choices[0].message.content.strip()
-    
-    sources_list = list(set([h['doc_name'] for h in valid_hits]))
+    sources_list = list(set([b.doc_name for b in blocks]))
     is_runbook = (intent_type == 'RUNBOOK_REQUEST')
-    
+
     runbook_style_type = topic_hint if is_runbook else None
     if is_runbook and (not runbook_style_type or runbook_style_type == 'general'):
          for source in sources_list:
@@ -298,12 +601,20 @@ Use markdown for readability but DO NOT use formal runbook/procedure headers."""
             if 'incident' in source_lower: runbook_style_type = 'incident'; break
             if 'system' in source_lower or 'admin' in source_lower: runbook_style_type = 'system_admin'; break
 
+    # Runbook-formatted answers are only produced after an explicit confirmation, so keep them out of the cache.
+    # The cache is shared by all users: an answer written with someone's conversation history in the
+    # prompt can carry details of their earlier turns, so only history-free answers are stored.
+    if cache_key is not None and not conversation_history:
+        pending["cache_key"] = cache_key
+
     return {
-        "answer": answer,
         "sources": sources_list,
         "is_runbook": is_runbook,
-        "runbook_type": runbook_style_type
-    }
+        "runbook_type": runbook_style_type,
+        "intent": intent_type,
+        "cache": cache_status,
+        "context": context_report
+    }, messages
 
 if __name__ == "__main__":
     print(answer_question("What is FX settlement risk?"))
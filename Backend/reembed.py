@@ -0,0 +1,111 @@
+"""Re-embed every chunk with another model/backend and swap the new vectors in.
+
+Usage (from Backend/):
+    python reembed.py --model BAAI/bge-small-en-v1.5 [--backend torch] [--index hnsw] [--resume]
+
+Vectors are written to a staging column (embedding_next, sized for the new model) in
+committed batches, so an interrupted run can continue with --resume. The swap (drop the
+ANN index, replace the embedding column) is a single transaction; queries keep using the
+old vectors until then. Compact halfvec/binary columns are dropped with the old vectors and
+re-created from the new ones. Afterwards set EMBED_MODEL_NAME / EMBED_BACKEND to the same values
+and restart the API, since stored and query vectors must come from the same model.
+"""
+import argparse
+import time
+from psycopg2.extras import execute_values
+from db import get_pool, vector_literal
+from embeddings import EmbeddingService, EMBED_BACKENDS
+from memory_index import get_memory_index
+import vector_index
+
+STAGING_COLUMN = "embedding_next"
+
+
+def prepare_column(conn, dimension, resume):
+    with conn.cursor() as cur:
+        if not resume:
+            cur.execute(f"ALTER TABLE doc_chunks DROP COLUMN IF EXISTS {STAGING_COLUMN}")
+        cur.execute(f"ALTER TABLE doc_chunks ADD COLUMN IF NOT EXISTS {STAGING_COLUMN} vector({int(dimension)})")
+    conn.commit()
+
+
+def fill(conn, service, batch_size):
+    done, start = 0, time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT COUNT(*) FROM doc_chunks WHERE {STAGING_COLUMN} IS NULL")
+        remaining = cur.fetchone()[0]
+    conn.rollback()
+    print(f"{remaining} chunks to embed")
+
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT doc_name, chunk_id, chunk_text FROM doc_chunks
+                WHERE {STAGING_COLUMN} IS NULL
+                ORDER BY doc_name, chunk_id
+                LIMIT %s
+            """, (batch_size,))
+            rows = cur.fetchall()
+            if not rows:
+                break
+            vectors = service.encode_documents([text for _, _, text in rows])
+            execute_values(cur, f"""
+                UPDATE doc_chunks SET {STAGING_COLUMN} = v.embedding::vector
+                FROM (VALUES %s) AS v(doc_name, chunk_id, embedding)
+                WHERE doc_chunks.doc_name = v.doc_name AND doc_chunks.chunk_id = v.chunk_id
+            """, [(d, c, vector_literal(v)) for (d, c, _), v in zip(rows, vectors)])
+        conn.commit()
+        done += len(rows)
+        elapsed = time.perf_counter() - start
+        print(f"  {done}/{remaining} chunks ({done / elapsed:.1f}/s)")
+
+
+def swap(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT COUNT(*) FROM doc_chunks WHERE {STAGING_COLUMN} IS NULL")
+        missing = cur.fetchone()[0]
+        if missing:
+            conn.rollback()
+            raise RuntimeError(f"{missing} chunks have no new embedding yet; rerun with --resume")
+        cur.execute(f"DROP INDEX IF EXISTS {vector_index.INDEX_NAME}")
+        # CASCADE also drops the generated compact columns (and their indexes) derived from the old vectors
+        cur.execute("ALTER TABLE doc_chunks DROP COLUMN embedding CASCADE")
+        cur.execute(f"ALTER TABLE doc_chunks RENAME COLUMN {STAGING_COLUMN} TO embedding")
+    conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", required=True)
+    parser.add_argument("--backend", default="torch", choices=EMBED_BACKENDS)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--index", choices=vector_index.INDEX_METHODS, default=None,
+                        help="rebuild the ANN index with this method after the swap")
+    parser.add_argument("--resume", action="store_true", help="keep vectors already in the staging column")
+    args = parser.parse_args()
+
+    service = EmbeddingService(model_name=args.model, backend=args.backend)
+    dimension = service.dimension
+    print(f"Re-embedding doc_chunks with {args.model} ({args.backend}, {dimension} dims)")
+
+    with get_pool().connection() as conn:
+        prepare_column(conn, dimension, args.resume)
+        fill(conn, service, args.batch_size)
+        compact = vector_index.compact_columns(conn)
+        swap(conn)
+        print("Swapped in the new embedding column.")
+        if args.index:
+            print(vector_index.create_index(conn, method=args.index))
+        for mode in compact:
+            index_method = "hnsw" if args.index == "hnsw" else None
+            print(vector_index.enable_compact_storage(conn, mode, index_method=index_method))
+        memory_index = get_memory_index()
+        if memory_index.size:
+            memory_index.rebuild(conn)
+            print(f"Rebuilt the in-memory index ({memory_index.size} chunks).")
+
+    print(f"Now set EMBED_MODEL_NAME={args.model} EMBED_BACKEND={args.backend} and restart the API.")
+
+
+if __name__ == "__main__":
+    main()
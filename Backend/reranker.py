@@ -0,0 +1,123 @@
+import os
+import threading
+import time
+import metrics
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() in ("1", "true", "yes")
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_BACKEND = os.getenv("RERANK_BACKEND", "torch")  # torch | onnx
+RERANK_ONNX_FILE = os.getenv("RERANK_ONNX_FILE") or None  # e.g. onnx/model_qint8_avx2.onnx for a quantized export
+RERANK_TOP_N = int(os.getenv("RERANK_TOP_N", "4"))
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "150"))
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "512"))
+RERANK_MIN_SCORE = float(os.getenv("RERANK_MIN_SCORE")) if os.getenv("RERANK_MIN_SCORE") else None
+
+# starting guess for the per-pair cost until real passes have been timed
+_INITIAL_PAIR_SECONDS = 0.01
+_EWMA = 0.2
+
+
+class Reranker:
+    """Cross-encoder rescoring of retrieved passages, one batched CPU forward pass per query.
+
+    The pass cannot be interrupted, so the time budget is enforced up front: the per-pair
+    cost is tracked and only as many of the best vector hits as fit the budget are scored.
+    """
+
+    def __init__(self, model_name=RERANK_MODEL, backend=RERANK_BACKEND, onnx_file=RERANK_ONNX_FILE,
+                 top_n=RERANK_TOP_N, budget_ms=RERANK_BUDGET_MS, max_length=RERANK_MAX_LENGTH,
+                 min_score=RERANK_MIN_SCORE):
+        self.model_name = model_name
+        self.backend = backend
+        self.onnx_file = onnx_file
+        self.top_n = top_n
+        self.budget_ms = budget_ms
+        self.max_length = max_length
+        self.min_score = min_score
+        self.pair_seconds = _INITIAL_PAIR_SECONDS
+        self._model = None
+        self._failed = False
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None and not self._failed:
+            with self._lock:
+                if self._model is None and not self._failed:
+                    try:
+                        self._model = self._load()
+                    except Exception as e:
+                        print(f"Reranker disabled, could not load {self.model_name}: {e}")
+                        self._failed = True
+        return self._model
+
+    def _load(self):
+        from sentence_transformers import CrossEncoder
+
+        print(f"Loading reranker: {self.model_name} (backend={self.backend})...")
+        if self.backend == "onnx":
+            model_kwargs = {"file_name": self.onnx_file} if self.onnx_file else {}
+            try:
+                return CrossEncoder(self.model_name, device="cpu", max_length=self.max_length,
+                                    backend="onnx", model_kwargs=model_kwargs)
+            except (TypeError, ImportError, ValueError) as e:
+                # older sentence-transformers or optimum/onnxruntime missing
+                print(f"ONNX reranker unavailable ({e}); using torch")
+                self.backend = "torch"
+        return CrossEncoder(self.model_name, device="cpu", max_length=self.max_length)
+
+    def warmup(self):
+        if self.model is not None:
+            self.model.predict([("warmup", "warmup")])
+        return self
+
+    def rerank(self, query, hits, top_n=None, budget_ms=None):
+        """Return the top_n hits by cross-encoder score (added as "rerank_score"); hits are assumed best-first."""
+        top_n = top_n or self.top_n
+        budget = (budget_ms if budget_ms is not None else self.budget_ms) / 1000.0
+        if len(hits) <= 1 or self.model is None:
+            return hits[:top_n]
+
+        fit = int(budget / self.pair_seconds) if budget > 0 else len(hits)
+        if fit < 2:
+            metrics.incr("rerank.skipped_budget")
+            # only a real pass updates the estimate, so drift back towards the starting guess while
+            # skipping; otherwise one slow pass (cold model, CPU contention) disables reranking for good
+            self.pair_seconds = (1 - _EWMA) * self.pair_seconds + _EWMA * _INITIAL_PAIR_SECONDS
+            return hits[:top_n]
+        scored = hits[:fit]
+        if len(scored) < len(hits):
+            metrics.incr("rerank.truncated")
+
+        start = time.perf_counter()
+        scores = self.model.predict([(query, h["text"]) for h in scored], batch_size=len(scored),
+                                    show_progress_bar=False)
+        elapsed = time.perf_counter() - start
+        self.pair_seconds = (1 - _EWMA) * self.pair_seconds + _EWMA * (elapsed / len(scored))
+        metrics.observe("rerank.seconds", elapsed)
+        metrics.incr("rerank.pairs", len(scored))
+        if budget > 0 and elapsed > budget:
+            metrics.incr("rerank.over_budget")
+
+        ranked = sorted(
+            (dict(h, rerank_score=float(s)) for h, s in zip(scored, scores)),
+            key=lambda h: h["rerank_score"], reverse=True
+        )
+        if self.min_score is not None:
+            ranked = [h for h in ranked if h["rerank_score"] >= self.min_score] or ranked[:1]
+        return ranked[:top_n]
+
+
+_reranker = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker():
+    global _reranker
+    if not RERANK_ENABLED:
+        return None
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = Reranker()
+    return _reranker
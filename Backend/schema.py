@@ -0,0 +1,141 @@
+import asyncio
+import threading
+
+# Idempotent DDL, applied at API startup (api._warm_database) before anything is served and by
+# command-line tools that write these tables; never on a request path.
+# Columns added to existing tables; ALTER TABLE takes an ACCESS EXCLUSIVE lock even when the
+# column exists, so it only runs for columns that are missing.
+COLUMNS = [
+    ("doc_chunks", "page_number", "integer"),
+    ("doc_chunks", "content_hash", "text"),
+]
+MIGRATIONS = [
+    # ingestion/index jobs, shared by every API process (jobs.JobStore)
+    """CREATE TABLE IF NOT EXISTS ingest_jobs (
+        id text PRIMARY KEY,
+        filename text,
+        doc_name text,
+        stage text NOT NULL,
+        chunks_total integer NOT NULL DEFAULT 0,
+        chunks_done integer NOT NULL DEFAULT 0,
+        result jsonb,
+        error text,
+        created_at double precision NOT NULL,
+        started_at double precision,
+        finished_at double precision,
+        updated_at timestamptz NOT NULL DEFAULT now()
+    )""",
+    "CREATE INDEX IF NOT EXISTS ingest_jobs_created_at_idx ON ingest_jobs (created_at)",
+]
+# Indexes on tables that already hold data, built with CREATE INDEX CONCURRENTLY outside any
+# transaction so reads and writes carry on during the build. The API builds them in the
+# background after startup; retrieval works without them, only slower.
+CONCURRENT_INDEXES = {
+    "doc_chunks_doc_name_chunk_id_idx": "ON doc_chunks (doc_name, chunk_id)",
+    # full-text side of hybrid retrieval (retriever.LEXICAL_SQL)
+    "doc_chunks_chunk_text_fts_idx": "ON doc_chunks USING gin (to_tsvector('simple', chunk_text))",
+    # chat listing (GROUP BY conversation_id per user) and per-chat message paging by id
+    "chat_history_user_conversation_idx": "ON chat_history (user_id, conversation_id, id)",
+}
+_COLUMN_EXISTS_SQL = """
+    SELECT EXISTS (SELECT 1 FROM information_schema.columns WHERE table_name = {} AND column_name = {})
+"""
+_INVALID_INDEX_SQL = """
+    SELECT NOT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = {}
+"""
+# taken for the migration transaction so API workers starting together apply it one at a time
+_MIGRATION_LOCK = 0x5C4E3A
+# session lock of the process building the indexes; the others skip the build instead of waiting
+_INDEX_LOCK = 0x5C4E3B
+
+_applied = False
+_lock = threading.Lock()
+_async_lock = None
+
+
+def _index_statements(name, invalid):
+    # an interrupted concurrent build leaves an invalid index that IF NOT EXISTS would keep
+    if invalid:
+        yield f"DROP INDEX CONCURRENTLY IF EXISTS {name}"
+    yield f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {CONCURRENT_INDEXES[name]}"
+
+
+def ensure_schema(conn):
+    """Apply MIGRATIONS, then build CONCURRENT_INDEXES (conn must not be inside a transaction)."""
+    global _applied
+    if _applied:
+        return
+    with _lock:
+        if _applied:
+            return
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(%s)", (_MIGRATION_LOCK,))
+                for table, column, column_type in COLUMNS:
+                    cur.execute(_COLUMN_EXISTS_SQL.format("%s", "%s"), (table, column))
+                    if not cur.fetchone()[0]:
+                        cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {column_type}")
+                for statement in MIGRATIONS:
+                    cur.execute(statement)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        build_indexes(conn)
+        _applied = True
+
+
+def build_indexes(conn):
+    """Build missing CONCURRENT_INDEXES; returns False if another process is building them."""
+    autocommit = conn.autocommit
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(%s)", (_INDEX_LOCK,))
+            if not cur.fetchone()[0]:
+                return False
+            try:
+                for name in CONCURRENT_INDEXES:
+                    cur.execute(_INVALID_INDEX_SQL.format("%s"), (name,))
+                    row = cur.fetchone()
+                    for statement in _index_statements(name, bool(row and row[0])):
+                        cur.execute(statement)
+            finally:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (_INDEX_LOCK,))
+    finally:
+        conn.autocommit = autocommit
+    return True
+
+
+async def ensure_schema_async(conn):
+    """ensure_schema for an asyncpg connection, without the index builds (see build_indexes_async)."""
+    global _applied, _async_lock
+    if _applied:
+        return
+    if _async_lock is None:
+        _async_lock = asyncio.Lock()
+    async with _async_lock:
+        if _applied:
+            return
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock($1)", _MIGRATION_LOCK)
+            for table, column, column_type in COLUMNS:
+                if not await conn.fetchval(_COLUMN_EXISTS_SQL.format("$1", "$2"), table, column):
+                    await conn.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {column_type}")
+            for statement in MIGRATIONS:
+                await conn.execute(statement)
+        _applied = True
+
+
+async def build_indexes_async(conn):
+    """build_indexes for an asyncpg connection."""
+    if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", _INDEX_LOCK):
+        return False
+    try:
+        for name in CONCURRENT_INDEXES:
+            invalid = await conn.fetchval(_INVALID_INDEX_SQL.format("$1"), name)
+            for statement in _index_statements(name, bool(invalid)):
+                await conn.execute(statement)
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", _INDEX_LOCK)
+    return True
@@ -1,7 +1,9 @@
 import requests
 import os
+import time
 
-API_URL = "http://127.0.0.1:8000/upload"
+API_BASE = "http://127.0.0.1:8000"
+API_URL = f"{API_BASE}/upload"
 
 runbooks = [
     "d:/java_rag/pdfs/00_SAP_TRM_Runbooks_Index.txt",
@@ -10,6 +12,20 @@ runbooks = [
     "d:/java_rag/pdfs/03_SAP_TRM_System_Administration_Troubleshooting.txt"
 ]
 
+JOB_TIMEOUT = float(os.getenv("UPLOAD_JOB_TIMEOUT", "1800"))
+
+def wait_for_job(job_id, interval=1.0, timeout=JOB_TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while True:
+        response = requests.get(f"{API_BASE}/jobs/{job_id}", timeout=30)
+        response.raise_for_status()
+        job = response.json()
+        if job.get("stage") in ("done", "failed"):
+            return job
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Job {job_id} still '{job.get('stage')}' after {timeout:.0f}s")
+        time.sleep(interval)
+
 def upload_file(file_path):
     if not os.path.exists(file_path):
         print(f"❌ File not found: {file_path}")
@@ -23,8 +39,12 @@ def upload_file(file_path):
             files = {'file': (filename, f, 'text/plain')}
             response = requests.post(API_URL, files=files)
         
-        if response.status_code == 200:
-            result = response.json()
+        if response.status_code in (200, 202):
+            job = wait_for_job(response.json()["job_id"])
+            if job["stage"] == "failed":
+                print(f"❌ Failed: {job.get('error')}")
+                return False
+            result = job["result"]
             print(f"✅ Success! Created {result.get('chunks_created', 0)} chunks")
             return True
         else:
@@ -0,0 +1,230 @@
+import math
+import os
+
+INDEX_NAME = "doc_chunks_embedding_ann_idx"
+INDEX_METHODS = ("hnsw", "ivfflat")
+INDEX_MAINTENANCE_WORK_MEM = os.getenv("INDEX_MAINTENANCE_WORK_MEM", "512MB")
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "0")) or None
+HNSW_EF_SEARCH_MAX = 1000  # pgvector rejects a larger hnsw.ef_search
+IVFFLAT_PROBES = int(os.getenv("IVFFLAT_PROBES", "0")) or None
+
+# Compact first-pass copies of the embedding, kept as generated columns so every write path fills them
+COMPACT_MODES = ("halfvec", "binary")
+COMPACT_COLUMNS = {"halfvec": "embedding_half", "binary": "embedding_bit"}
+COMPACT_INDEX_NAMES = {"halfvec": "doc_chunks_embedding_half_idx", "binary": "doc_chunks_embedding_bit_idx"}
+_COMPACT_DEFINITIONS = {
+    "halfvec": ("halfvec({dims})", "embedding::halfvec({dims})", "halfvec_cosine_ops"),
+    "binary": ("bit({dims})", "binary_quantize(embedding)::bit({dims})", "bit_hamming_ops"),
+}
+
+
+def default_lists(row_count):
+    # pgvector guidance: rows / 1000 up to 1M rows, sqrt(rows) beyond
+    if row_count <= 1_000_000:
+        return max(10, row_count // 1000)
+    return int(math.sqrt(row_count))
+
+
+def _autocommit(conn):
+    conn.rollback()
+    previous = conn.autocommit
+    conn.autocommit = True
+    return previous
+
+
+def _row_count(cur):
+    cur.execute("SELECT COUNT(*) FROM doc_chunks")
+    return cur.fetchone()[0]
+
+
+def current_index(cur, name=INDEX_NAME):
+    """(method, definition, valid) of the index, or None; a failed or cancelled CONCURRENTLY build leaves it invalid."""
+    cur.execute("""
+        SELECT am.amname, pg_get_indexdef(i.indexrelid), i.indisvalid
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        JOIN pg_am am ON am.oid = c.relam
+        WHERE c.relname = %s
+    """, (name,))
+    return cur.fetchone()
+
+
+def create_index(conn, method="hnsw", m=16, ef_construction=64, lists=None, concurrently=True, replace=False):
+    """Create the ANN index on doc_chunks.embedding; replaces an invalid index, one built with another method or
+    any index when replace=True."""
+    if method not in INDEX_METHODS:
+        raise ValueError(f"Unsupported index method '{method}', expected one of {INDEX_METHODS}")
+
+    previous = _autocommit(conn)
+    try:
+        with conn.cursor() as cur:
+            existing = current_index(cur)
+            if existing and (replace or existing[0] != method or not existing[2]):
+                cur.execute(f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {INDEX_NAME}")
+                existing = None
+            if existing:
+                return {"created": False, "method": method, "definition": existing[1]}
+
+            if method == "hnsw":
+                options = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+            else:
+                options = f"lists = {int(lists or default_lists(_row_count(cur)))}"
+            cur.execute("SET maintenance_work_mem = %s", (INDEX_MAINTENANCE_WORK_MEM,))
+            cur.execute(
+                f"CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {INDEX_NAME} "
+                f"ON doc_chunks USING {method} (embedding vector_cosine_ops) WITH ({options})"
+            )
+            cur.execute("ANALYZE doc_chunks")
+            return {"created": True, "method": method, "definition": current_index(cur)[1]}
+    finally:
+        conn.autocommit = previous
+
+
+def rebuild_index(conn, concurrently=True):
+    previous = _autocommit(conn)
+    try:
+        with conn.cursor() as cur:
+            if not current_index(cur):
+                raise LookupError(f"Index {INDEX_NAME} does not exist")
+            cur.execute("SET maintenance_work_mem = %s", (INDEX_MAINTENANCE_WORK_MEM,))
+            cur.execute(f"REINDEX INDEX {'CONCURRENTLY ' if concurrently else ''}{INDEX_NAME}")
+            return {"rebuilt": True, "definition": current_index(cur)[1]}
+    finally:
+        conn.autocommit = previous
+
+
+def drop_index(conn, concurrently=True):
+    previous = _autocommit(conn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {INDEX_NAME}")
+            return {"dropped": True}
+    finally:
+        conn.autocommit = previous
+
+
+def index_report(conn):
+    with conn.cursor() as cur:
+        rows = _row_count(cur)
+        cur.execute("SELECT pg_total_relation_size('doc_chunks'), pg_relation_size('doc_chunks')")
+        total_size, table_size = cur.fetchone()
+        report = {
+            "index_name": INDEX_NAME,
+            "rows": rows,
+            "table_bytes": table_size,
+            "total_bytes": total_size,
+            "exists": False
+        }
+        existing = current_index(cur)
+        if existing:
+            cur.execute("""
+                SELECT pg_relation_size(s.indexrelid), s.idx_scan, s.idx_tup_read, i.indisvalid
+                FROM pg_stat_user_indexes s
+                JOIN pg_index i ON i.indexrelid = s.indexrelid
+                WHERE s.indexrelname = %s
+            """, (INDEX_NAME,))
+            size, scans, tuples_read, valid = cur.fetchone()
+            report.update({
+                "exists": True,
+                "method": existing[0],
+                "definition": existing[1],
+                "index_bytes": size,
+                "valid": valid,
+                "scans": scans,
+                "tuples_read": tuples_read
+            })
+        cur.execute("""
+            SELECT phase, blocks_done, blocks_total, tuples_done, tuples_total
+            FROM pg_stat_progress_create_index
+            WHERE relid = 'doc_chunks'::regclass
+        """)
+        progress = cur.fetchone()
+        if progress:
+            report["build_progress"] = dict(zip(("phase", "blocks_done", "blocks_total", "tuples_done", "tuples_total"), progress))
+    conn.rollback()
+    return report
+
+
+def compact_columns(conn):
+    """Compact modes whose column exists on doc_chunks."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_name = 'doc_chunks' AND column_name = ANY(%s)
+        """, (list(COMPACT_COLUMNS.values()),))
+        present = {row[0] for row in cur.fetchall()}
+    conn.rollback()
+    return [mode for mode, column in COMPACT_COLUMNS.items() if column in present]
+
+
+def enable_compact_storage(conn, mode, index_method=None, m=16, ef_construction=64):
+    """Add the generated compact column for mode (filling existing rows) and optionally an HNSW index on it."""
+    if mode not in COMPACT_MODES:
+        raise ValueError(f"Unsupported compact mode '{mode}', expected one of {COMPACT_MODES}")
+    if index_method not in (None, "hnsw"):
+        raise ValueError("Compact columns are indexed with hnsw only")
+    column, index_name = COMPACT_COLUMNS[mode], COMPACT_INDEX_NAMES[mode]
+
+    previous = _autocommit(conn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT vector_dims(embedding) FROM doc_chunks LIMIT 1")
+            row = cur.fetchone()
+            if row is None:
+                raise LookupError("doc_chunks is empty; the column dimension is taken from the stored vectors")
+            column_type, expression, opclass = (part.format(dims=int(row[0])) for part in _COMPACT_DEFINITIONS[mode])
+            # rewrites the table once to fill the column for existing rows
+            cur.execute(f"ALTER TABLE doc_chunks ADD COLUMN IF NOT EXISTS {column} {column_type} "
+                        f"GENERATED ALWAYS AS ({expression}) STORED")
+            if index_method:
+                existing = current_index(cur, index_name)
+                if existing and not existing[2]:  # left behind by a failed build; IF NOT EXISTS would keep it
+                    cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+                cur.execute("SET maintenance_work_mem = %s", (INDEX_MAINTENANCE_WORK_MEM,))
+                cur.execute(
+                    f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON doc_chunks "
+                    f"USING hnsw ({column} {opclass}) WITH (m = {int(m)}, ef_construction = {int(ef_construction)})"
+                )
+            cur.execute("ANALYZE doc_chunks")
+        return {"mode": mode, "column": column, "dimensions": int(row[0]), "index": index_name if index_method else None}
+    finally:
+        conn.autocommit = previous
+
+
+def disable_compact_storage(conn, mode):
+    previous = _autocommit(conn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {COMPACT_INDEX_NAMES[mode]}")
+            cur.execute(f"ALTER TABLE doc_chunks DROP COLUMN IF EXISTS {COMPACT_COLUMNS[mode]}")
+        return {"mode": mode, "dropped": True}
+    finally:
+        conn.autocommit = previous
+
+
+def storage_report(conn):
+    """Bytes per embedding representation and per index on doc_chunks."""
+    with conn.cursor() as cur:
+        columns = ["embedding"] + [COMPACT_COLUMNS[mode] for mode in compact_columns(conn)]
+        sizes = ", ".join(f"COALESCE(SUM(pg_column_size({c})), 0)" for c in columns)
+        cur.execute(f"SELECT {sizes} FROM doc_chunks")
+        column_bytes = dict(zip(columns, (int(v) for v in cur.fetchone())))
+        cur.execute("""
+            SELECT indexrelname, pg_relation_size(indexrelid)
+            FROM pg_stat_user_indexes WHERE relname = 'doc_chunks'
+        """)
+        index_bytes = dict(cur.fetchall())
+        cur.execute("SELECT pg_relation_size('doc_chunks'), pg_total_relation_size('doc_chunks')")
+        table_bytes, total_bytes = cur.fetchone()
+    conn.rollback()
+    return {"table_bytes": table_bytes, "total_bytes": total_bytes, "column_bytes": column_bytes, "index_bytes": index_bytes}
+
+
+def apply_search_settings(cur, ef_search=None, probes=None):
+    """SET LOCAL the per-query ANN knobs; must run inside the transaction that executes the search."""
+    ef_search = ef_search or HNSW_EF_SEARCH
+    probes = probes or IVFFLAT_PROBES
+    if ef_search:
+        cur.execute(f"SET LOCAL hnsw.ef_search = {min(int(ef_search), HNSW_EF_SEARCH_MAX)}")
+    if probes:
+        cur.execute(f"SET LOCAL ivfflat.probes = {int(probes)}")
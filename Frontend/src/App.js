@@ -14,6 +14,7 @@ export default function App() {
   const profileRef = useRef(null);
 
   const [chatHistory, setChatHistory] = useState([]);
+  const [chatsCursor, setChatsCursor] = useState(null);
   const [currentChatId, setCurrentChatId] = useState(Date.now());
 
   const [analytics, setAnalytics] = useState({ totalQuestions: 0, searches: [] });
@@ -107,19 +108,49 @@ export default function App() {
     }
   }, [user]);
 
+  // Chat list is paged: the first page replaces the sidebar list, later pages (cursor) are appended
+  const fetchChatPage = async (userId, cursor = null) => {
+    const params = new URLSearchParams({ user_id: userId });
+    if (cursor) params.set("cursor", cursor);
+    const res = await fetch(`${settings.apiEndpoint}/chats?${params}`);
+    const data = await res.json();
+    if (!data.chats || !Array.isArray(data.chats)) return;
+    setChatHistory(prev => (cursor ? [...prev, ...data.chats] : data.chats));
+    setChatsCursor(data.next_cursor || null);
+  };
+
   const fetchChatHistory = async () => {
     if (!user) return;
     try {
-      const res = await fetch(`${settings.apiEndpoint}/chats?user_id=${user.id}`);
-      const data = await res.json();
-      if (data.chats && Array.isArray(data.chats)) {
-        setChatHistory(data.chats);
-      }
+      await fetchChatPage(user.id);
     } catch (e) {
       console.error("Failed to load history:", e);
     }
   };
 
+  const loadMoreChats = async () => {
+    if (!user || !chatsCursor) return;
+    try {
+      await fetchChatPage(user.id, chatsCursor);
+    } catch (e) {
+      console.error("Failed to load more chats:", e);
+    }
+  };
+
+  const fetchChatMessages = async (chatId) => {
+    const loaded = [];
+    let after = null;
+    do {
+      const params = new URLSearchParams({ user_id: user.id });
+      if (after) params.set("after", after);
+      const res = await fetch(`${settings.apiEndpoint}/chats/${chatId}/messages?${params}`);
+      const data = await res.json();
+      loaded.push(...(data.messages || []).map(({ sender, text }) => ({ sender, text })));
+      after = data.next_cursor;
+    } while (after);
+    return loaded;
+  };
+
   const newChat = () => {
     if (messages.length > 0) {
       const chatTitle = messages[0]?.text?.slice(0, 30) || "Untitled Chat";
@@ -141,18 +172,24 @@ export default function App() {
     setActiveView("Dashboard");
   };
 
-  const loadChat = (chatId) => {
+  const loadChat = async (chatId) => {
     const selectedChat = chatHistory.find(c => String(c.id) === String(chatId));
     if (selectedChat) {
       setCurrentChatId(chatId);
-      // Use messages from chatHistory state (already loaded from /chats endpoint)
+      setInput(""); // Clear any leftover input from previous chat
+      setActiveView("Dashboard");
+      // Chats kept locally by newChat carry their messages; listed chats load them on demand
       if (selectedChat.messages && Array.isArray(selectedChat.messages)) {
         setMessages(selectedChat.messages);
-      } else {
-        setMessages([]);
+        return;
+      }
+      setMessages([]);
+      if (!user) return;
+      try {
+        setMessages(await fetchChatMessages(chatId));
+      } catch (e) {
+        console.error("Failed to load chat messages:", e);
       }
-      setInput(""); // Clear any leftover input from previous chat
-      setActiveView("Dashboard");
     }
   };
 
@@ -244,7 +281,7 @@ export default function App() {
 
     setIsTyping(true);
     try {
-      const response = await fetch(`${settings.apiEndpoint}/ask`, {
+      const response = await fetch(`${settings.apiEndpoint}/ask/stream`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({
@@ -254,28 +291,60 @@ export default function App() {
           user_id: user?.id  // Added for chat history persistence
         })
       });
-      const data = await response.json();
-      setIsTyping(false);
-
-      const assistantResponse = data.answer || "No response.";
-      const systemMsg = {
-        sender: "system",
-        text: assistantResponse,
-        is_runbook: data.is_runbook || false,
-        runbook_type: data.runbook_type || null,
-        sources: data.sources || []
+      if (!response.ok || !response.body) throw new Error(`HTTP ${response.status}`);
+
+      // Server-sent events: "meta" (sources, intent) first, then "token"s, then "done"
+      let systemMsg = null;
+      const updateSystemMsg = (changes) => {
+        setIsTyping(false);
+        if (!systemMsg) {
+          systemMsg = { sender: "system", text: "", is_runbook: false, runbook_type: null, sources: [], ...changes };
+          setMessages(prev => [...prev, systemMsg]);
+          return;
+        }
+        const previous = systemMsg;
+        systemMsg = { ...systemMsg, ...changes };
+        setMessages(prev => prev.map(m => (m === previous ? systemMsg : m)));
       };
 
-      setMessages(prev => [...prev, systemMsg]);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let streamedText = "";
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let boundary;
+        while ((boundary = buffer.indexOf("\n\n")) >= 0) {
+          const rawEvent = buffer.slice(0, boundary);
+          buffer = buffer.slice(boundary + 2);
+          const eventName = (rawEvent.match(/^event: (.*)$/m) || [])[1];
+          const dataLine = (rawEvent.match(/^data: (.*)$/m) || [])[1];
+          if (!eventName || !dataLine) continue;
+          const data = JSON.parse(dataLine);
+          if (eventName === "meta") {
+            updateSystemMsg({
+              is_runbook: data.is_runbook || false,
+              runbook_type: data.runbook_type || null,
+              sources: data.sources || []
+            });
+          } else if (eventName === "token") {
+            streamedText += data.text;
+            updateSystemMsg({ text: streamedText });
+          } else if (eventName === "done") {
+            updateSystemMsg({ text: data.answer || streamedText || "No response." });
+          } else if (eventName === "error") {
+            throw new Error(data.detail);
+          }
+        }
+      }
+      if (!systemMsg) updateSystemMsg({ text: "No response." });
 
       // Reload chats from backend to update sidebar without duplicates
       if (user) {
         try {
-          const chatsResponse = await fetch(`${settings.apiEndpoint}/chats?user_id=${user.id}`);
-          const chatsData = await chatsResponse.json();
-          if (chatsData.chats && Array.isArray(chatsData.chats)) {
-            setChatHistory(chatsData.chats);
-          }
+          await fetchChatPage(user.id);
         } catch (e) {
           console.error("Failed to reload chats:", e);
         }
@@ -311,6 +380,7 @@ export default function App() {
     setAuthState("login");
     setMessages([]);
     setChatHistory([]); // Clear chat history state
+    setChatsCursor(null);
   };
   window.handleLogout = handleLogout;
 
@@ -332,14 +402,9 @@ export default function App() {
     });
 
     // Load user's chat history ONLY from backend
+    setChatHistory([]); // Start with empty if no chats
     try {
-      const response = await fetch(`${settings.apiEndpoint}/chats?user_id=${userData.id}`);
-      const data = await response.json();
-      if (data.chats && Array.isArray(data.chats)) {
-        setChatHistory(data.chats);
-      } else {
-        setChatHistory([]); // Start with empty if no chats
-      }
+      await fetchChatPage(userData.id);
     } catch (e) {
       console.error("Failed to load chat history:", e);
       setChatHistory([]); // Start with empty on error
@@ -670,6 +735,8 @@ export default function App() {
             newChat={newChat}
             chatHistory={chatHistory}
             loadChat={loadChat}
+            hasMoreChats={Boolean(chatsCursor)}
+            loadMoreChats={loadMoreChats}
             activeView={activeView}
             onMenuClick={handleMenuClick}
             deleteChat={deleteChat}
@@ -1,6 +1,7 @@
 import React, { useRef, useEffect, useState } from "react";
 import Message from "./Message";
 import { FiMic, FiMicOff, FiPaperclip, FiFileText, FiX } from "react-icons/fi";
+import { waitForIngestionJob, IngestionStillProcessing } from "./UploadDocument";
 
 export default function ChatWindow({
   messages, input, setInput, sendMessage,
@@ -86,11 +87,17 @@ export default function ChatWindow({
           setIsUploading(false);
           return;
         }
+        await waitForIngestionJob(apiEndpoint, data.job_id);
         if (onUploadSuccess) onUploadSuccess(data.document_name || attachedFile.name);
       } catch (error) {
-        alert(`Upload failed: ${error.message}`);
-        setIsUploading(false);
-        return;
+        if (error instanceof IngestionStillProcessing) {
+          // uploaded and still running on the server; clear the attachment so it is not sent twice
+          alert(`${attachedFile.name}: ${error.message}`);
+        } else {
+          alert(`Upload failed: ${error.message}`);
+          setIsUploading(false);
+          return;
+        }
       }
       setIsUploading(false);
       setAttachedFile(null);
@@ -13,6 +13,8 @@ export default function Sidebar({
   newChat,
   chatHistory = [],
   loadChat,
+  hasMoreChats = false,
+  loadMoreChats,
   activeView,
   onMenuClick,
   deleteChat,
@@ -235,6 +237,14 @@ export default function Sidebar({
                     </div>
                   ))
                 )}
+                {hasMoreChats && loadMoreChats && (
+                  <div className="search-result-item" onClick={loadMoreChats}>
+                    <FiClock className="result-icon" />
+                    <div className="result-info">
+                      <div className="result-title">Load older chats</div>
+                    </div>
+                  </div>
+                )}
               </div>
             </div>
           </div>
@@ -1,11 +1,60 @@
 import React, { useState } from 'react';
 import '../styles/UploadDocument.css';
 
+// Thrown when a job is still running at the polling deadline; it may finish later.
+export class IngestionStillProcessing extends Error {
+    constructor(job) {
+        super('The document is still being processed. Check back later.');
+        this.name = 'IngestionStillProcessing';
+        this.job = job;
+    }
+}
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+export async function waitForIngestionJob(apiEndpoint, jobId, onProgress, {
+    timeoutMs = 30 * 60 * 1000,
+    intervalMs = 1000,
+    maxIntervalMs = 10000,
+} = {}) {
+    const deadline = Date.now() + timeoutMs;
+    let delay = intervalMs;
+    let job = null;
+    while (Date.now() < deadline) {
+        let response = null;
+        try {
+            response = await fetch(`${apiEndpoint}/jobs/${jobId}`);
+        } catch (err) {
+            // network error: keep polling until the deadline
+        }
+        if (response && response.ok) {
+            job = await response.json();
+            if (onProgress) {
+                onProgress(job);
+            }
+            if (job.stage === 'done') {
+                return job.result;
+            }
+            if (job.stage === 'failed') {
+                throw new Error(job.error || 'Processing failed');
+            }
+        } else if (response && response.status < 500) {
+            const body = await response.json().catch(() => ({}));
+            throw new Error(body.detail || 'Failed to fetch upload status');
+        }
+        await sleep(Math.min(delay, Math.max(deadline - Date.now(), 0)));
+        delay = Math.min(delay * 1.5, maxIntervalMs);
+    }
+    throw new IngestionStillProcessing(job);
+}
+
 export default function UploadDocument({ apiEndpoint, onUploadSuccess }) {
     const [isDragging, setIsDragging] = useState(false);
     const [uploading, setUploading] = useState(false);
     const [uploadResult, setUploadResult] = useState(null);
     const [error, setError] = useState(null);
+    const [stillProcessing, setStillProcessing] = useState(null);
+    const [progress, setProgress] = useState(null);
 
     const handleDragOver = (e) => {
         e.preventDefault();
@@ -45,6 +94,7 @@ export default function UploadDocument({ apiEndpoint, onUploadSuccess }) {
         setUploading(true);
         setError(null);
         setUploadResult(null);
+        setStillProcessing(null);
 
         try {
             const formData = new FormData();
@@ -58,9 +108,11 @@ export default function UploadDocument({ apiEndpoint, onUploadSuccess }) {
             const data = await response.json();
 
             if (response.ok) {
-                setUploadResult(data);
+                const result = await waitForIngestionJob(apiEndpoint, data.job_id, setProgress);
+                const finished = { ...result, message: 'Document uploaded successfully!' };
+                setUploadResult(finished);
                 if (onUploadSuccess) {
-                    onUploadSuccess(data);
+                    onUploadSuccess(finished);
                 }
                 // Clear result after 5 seconds
                 setTimeout(() => setUploadResult(null), 5000);
@@ -69,10 +121,15 @@ export default function UploadDocument({ apiEndpoint, onUploadSuccess }) {
                 setTimeout(() => setError(null), 5000);
             }
         } catch (err) {
-            setError('Failed to upload document. Please check your connection.');
-            setTimeout(() => setError(null), 5000);
+            if (err instanceof IngestionStillProcessing) {
+                setStillProcessing({ filename: file.name, message: err.message });
+            } else {
+                setError(err.message || 'Failed to upload document. Please check your connection.');
+                setTimeout(() => setError(null), 5000);
+            }
         } finally {
             setUploading(false);
+            setProgress(null);
         }
     };
 
@@ -89,7 +146,11 @@ export default function UploadDocument({ apiEndpoint, onUploadSuccess }) {
                     {uploading ? (
                         <>
                             <strong>Uploading...</strong>
-                            <p>Processing and embedding your document</p>
+                            <p>
+                                {progress && progress.chunks_total
+                                    ? `${progress.stage}: ${progress.chunks_done}/${progress.chunks_total} chunks`
+                                    : 'Processing and embedding your document'}
+                            </p>
                         </>
                     ) : (
                         <>
@@ -118,6 +179,17 @@ export default function UploadDocument({ apiEndpoint, onUploadSuccess }) {
                 </div>
             )}
 
+            {/* Still processing after the polling deadline */}
+            {stillProcessing && (
+                <div className="upload-result pending">
+                    <div className="result-icon">…</div>
+                    <div className="result-content">
+                        <strong>Still Processing</strong>
+                        <p>{stillProcessing.filename}: {stillProcessing.message}</p>
+                    </div>
+                </div>
+            )}
+
             {/* Error Message */}
             {error && (
                 <div className="upload-result error">